@@ -0,0 +1,255 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeoutError
+
+from metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+class PredictionWriter:
+    """Background writer that batches prediction rows into bulk upserts.
+
+    Records are buffered in a bounded queue and flushed by a single thread when
+    either `batch_size` records are waiting or `flush_interval` seconds have
+    passed since the last flush. Rows with an existing `loan_id` are updated in
+    place instead of failing on the unique constraint.
+
+    Transient errors (deadlocks, dropped connections, timeouts) are retried
+    with exponential backoff. Any other error splits the batch in halves, so
+    a bad row costs only itself, not the rest of the batch.
+    """
+
+    def __init__(self, session_factory, table, batch_size: int = 500,
+                 flush_interval: float = 1.0, max_queue_size: int = 10000,
+                 before_upsert: Optional[Callable] = None,
+                 max_retries: int = 5, retry_backoff: float = 0.1):
+        self.session_factory = session_factory
+        self.table = table
+        # Called as before_upsert(db, rows) in the upsert's transaction, e.g. to
+        # maintain rollups; a failure rolls back the whole flush
+        self.before_upsert = before_upsert
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "superseded": 0,
+            "dropped": 0,
+            "failed": 0,
+            "retries": 0,
+            "flushes": 0,
+            "last_flush_rows": 0,
+            "last_flush_seconds": 0.0,
+        }
+
+    def start(self):
+        """Start the flush thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prediction-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flush thread, writing out everything still buffered"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # Flushing here too would race the thread's upsert (and rollup
+                # deltas); it drains the rest of the queue itself before exiting
+                logger.warning(f"⚠️ Prediction writer still flushing after {timeout:g}s, leaving it to finish")
+                return
+            self._thread = None
+        # Anything enqueued after the thread exited
+        while not self.queue.empty():
+            self._flush(self._drain(self.batch_size))
+
+    def offer(self, record: Dict) -> bool:
+        """Enqueue a record without blocking; False if the buffer is full"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            return False
+        self._count("enqueued")
+        return True
+
+    def put(self, record: Dict, timeout: float = 5.0) -> bool:
+        """Enqueue a record, waiting up to `timeout` seconds for buffer space.
+
+        This is the backpressure path: callers block while the database
+        catches up. Records that still don't fit are dropped and counted.
+        """
+        try:
+            self.queue.put(record, timeout=timeout)
+        except queue.Full:
+            self._count("dropped")
+            logger.warning("Prediction audit buffer full, dropping record")
+            return False
+        self._count("enqueued")
+        return True
+
+    def metrics(self) -> Dict:
+        """Snapshot of writer counters"""
+        with self._lock:
+            snapshot = dict(self.stats)
+        snapshot["queue_depth"] = self.queue.qsize()
+        snapshot["queue_capacity"] = self.queue.maxsize
+        snapshot["running"] = self._thread is not None and self._thread.is_alive()
+        return snapshot
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _drain(self, limit: int) -> List[Dict]:
+        records = []
+        while len(records) < limit:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def _run(self):
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            records = []
+            # Size-or-time trigger: block for the first record, then keep
+            # collecting until the batch is full or the interval elapses
+            while len(records) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set():
+                    break
+                try:
+                    records.append(self.queue.get(timeout=min(remaining, 0.1)))
+                except queue.Empty:
+                    continue
+                records.extend(self._drain(self.batch_size - len(records)))
+            self._flush(records)
+        # Final flush on shutdown
+        while not self.queue.empty():
+            self._flush(self._drain(self.batch_size))
+
+    def _flush(self, records: List[Dict]):
+        if not records:
+            return
+        started = time.perf_counter()
+        rows = latest_per_loan(records)
+        errors = []
+        written = self._write(rows, errors)
+        if errors:
+            # The driver's message, without the multi-row statement SQLAlchemy appends
+            error = getattr(errors[-1], "orig", None) or errors[-1]
+            logger.error(f"❌ Bulk insert lost {len(rows) - written} of {len(rows)} predictions: {error}")
+        elapsed = time.perf_counter() - started
+        # The database side of persisting: upsert and rollups, retries included
+        observe_stage("db_flush", elapsed)
+        with self._lock:
+            # Rows actually upserted; older records for the same loan_id in
+            # this batch never reach the table
+            self.stats["written"] += written
+            self.stats["superseded"] += len(records) - len(rows)
+            self.stats["flushes"] += 1
+            self.stats["last_flush_rows"] = written
+            self.stats["last_flush_seconds"] = elapsed
+
+    def _write(self, rows: List[Dict], errors: List[Exception]) -> int:
+        """Upsert rows in one transaction, retrying transient errors; returns rows written"""
+        for attempt in range(self.max_retries + 1):
+            db = self.session_factory()
+            try:
+                if self.before_upsert is not None:
+                    self.before_upsert(db, rows)
+                db.execute(self._upsert_statement(db, rows))
+                db.commit()
+                return len(rows)
+            except Exception as e:
+                db.rollback()
+                error = e
+            finally:
+                db.close()
+            if not is_transient(error):
+                break
+            if attempt < self.max_retries:
+                delay = self.retry_backoff * 2 ** attempt
+                self._count("retries")
+                logger.warning(f"⚠️ Bulk insert of {len(rows)} predictions failed ({type(error).__name__}), retrying in {delay:g}s")
+                time.sleep(delay)
+
+        if not is_transient(error) and len(rows) > 1:
+            # Isolate the rows the database rejects
+            middle = len(rows) // 2
+            return self._write(rows[:middle], errors) + self._write(rows[middle:], errors)
+        self._count("failed", len(rows))
+        errors.append(error)
+        return 0
+
+    def _upsert_statement(self, db, rows: List[Dict]):
+        """Multi-row INSERT ... ON CONFLICT (loan_id) DO UPDATE for the session's dialect"""
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise RuntimeError(f"Bulk upsert not supported for dialect {dialect}")
+
+        stmt = insert(self.table).values(rows)
+        update_columns = {
+            col: stmt.excluded[col]
+            for col in rows[0].keys()
+            if col != "loan_id"
+        }
+        return stmt.on_conflict_do_update(index_elements=["loan_id"], set_=update_columns)
+
+def is_transient(error: Exception) -> bool:
+    """Deadlocks, serialization failures, statement timeouts, dropped connections and pool timeouts"""
+    if isinstance(error, (OperationalError, PoolTimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+def latest_per_loan(records: List[Dict]) -> List[Dict]:
+    """Last record per loan_id: a single upsert can't touch the same conflicting row twice"""
+    unique = {}
+    for record in records:
+        unique[record["loan_id"]] = record
+    return list(unique.values())
+
+def prediction_record(application: Dict, prediction, probability, model_version: str = None) -> Dict:
+    """Column values for one predictions row"""
+    return {
+        "loan_id": application.get('LoanID', 'unknown'),
+        "prediction_result": bool(prediction),
+        "confidence": float(probability),
+        "age": application.get('Age'),
+        "income": application.get('Income'),
+        "loan_amount": application.get('LoanAmount'),
+        "credit_score": application.get('CreditScore'),
+        "months_employed": application.get('MonthsEmployed'),
+        "num_credit_lines": application.get('NumCreditLines'),
+        "interest_rate": application.get('InterestRate'),
+        "loan_term": application.get('LoanTerm'),
+        "dti_ratio": application.get('DTIRatio'),
+        "education": application.get('Education'),
+        "employment_type": application.get('EmploymentType'),
+        "marital_status": application.get('MaritalStatus'),
+        "has_mortgage": application.get('HasMortgage', False),
+        "has_dependents": application.get('HasDependents', False),
+        "loan_purpose": application.get('LoanPurpose'),
+        "has_cosigner": application.get('HasCoSigner', False),
+        "model_version": model_version,
+        # Multi-row inserts bypass the ORM column default
+        "created_at": datetime.utcnow(),
+    }
@@ -0,0 +1,139 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cpu_budget import available_cpus
+from prediction import LoanPredictor
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# Per-process predictor, created by the pool initializer
+_worker_predictor = None
+
+def _init_worker(model_path: str, threads: int):
+    global _worker_predictor
+    _worker_predictor = LoanPredictor(model_path)
+    # One booster thread per process unless asked otherwise, so the pool
+    # doesn't oversubscribe cores
+    _worker_predictor.model.set_params(n_jobs=threads)
+
+def score_frame(predictor: LoanPredictor, chunk: pd.DataFrame) -> np.ndarray:
+    """Approval probabilities for a chunk of applications"""
+    X = predictor.encoder.encode_frame(chunk)
+    return predictor.predict_proba_matrix(X)
+
+def _score_in_worker(chunk: pd.DataFrame) -> np.ndarray:
+    return score_frame(_worker_predictor, chunk)
+
+def read_chunks(path: str, chunk_size: int):
+    """Yield DataFrame chunks from a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+        self._header_written = False
+
+    def write(self, chunk: pd.DataFrame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            chunk.to_csv(self.path, mode='a' if self._header_written else 'w',
+                         header=not self._header_written, index=False)
+            self._header_written = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def score_file(input_path: str, output_path: str, model_path: str = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = None, threads: int = 1) -> dict:
+    """Score every row of input_path, streaming results to output_path.
+
+    At most 2 * workers chunks are in flight, so memory is bounded by the chunk
+    size rather than the file size. Output rows keep the input order and gain
+    `prediction` and `probability` columns.
+    """
+    if workers is None:
+        workers = available_cpus()
+    writer = ChunkWriter(output_path)
+    started = time.perf_counter()
+    rows = 0
+
+    def emit(chunk, probabilities):
+        nonlocal rows
+        chunk = chunk.assign(
+            prediction=(probabilities > 0.5).astype(np.int64),
+            probability=probabilities
+        )
+        writer.write(chunk)
+        rows += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"Scored {rows:,} rows ({rows / elapsed:,.0f} rows/sec)")
+
+    try:
+        if workers <= 0:
+            # In-process scoring, useful for small files and debugging
+            predictor = LoanPredictor(model_path)
+            predictor.model.set_params(n_jobs=threads)
+            for chunk in read_chunks(input_path, chunk_size):
+                emit(chunk, score_frame(predictor, chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path, threads)) as pool:
+                pending = deque()
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append((chunk, pool.submit(_score_in_worker, chunk)))
+                    # Write in order once enough work is queued
+                    while len(pending) >= 2 * workers:
+                        done_chunk, future = pending.popleft()
+                        emit(done_chunk, future.result())
+                while pending:
+                    done_chunk, future = pending.popleft()
+                    emit(done_chunk, future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of loan applications")
+    parser.add_argument("input", help="Input .csv or .parquet file in the feature_columns.json schema")
+    parser.add_argument("output", help="Output .csv or .parquet file")
+    parser.add_argument("--model", default=None, help="Model artifact (default: xgboost_model.ubj, then .json)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Scoring processes (default: CPU count, 0 scores in-process)")
+    parser.add_argument("--threads", type=int, default=1, help="XGBoost threads per worker")
+    args = parser.parse_args()
+
+    summary = score_file(args.input, args.output, args.model, args.chunk_size, args.workers, args.threads)
+    print(f"Done: {summary['rows']:,} rows in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} rows/sec)")
+
+if __name__ == "__main__":
+    main()
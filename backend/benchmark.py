@@ -0,0 +1,228 @@
+"""Latency and throughput benchmarks for the prediction path.
+
+Usage (from backend/):
+    python benchmark.py --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+
+Payloads come from train_model.generate_synthetic_data. The end-to-end
+section drives /predict through an in-process ASGI client against a
+throwaway SQLite database and needs httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from cpu_budget import available_cpus
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000]
+
+def summarize(latencies, rows_per_call: int = 1) -> dict:
+    """Percentiles (ms) and throughput for a list of per-call latencies in seconds"""
+    latencies = np.asarray(latencies)
+    total = latencies.sum()
+    return {
+        "calls": int(len(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "p95_ms": float(np.percentile(latencies, 95) * 1e3),
+        "p99_ms": float(np.percentile(latencies, 99) * 1e3),
+        "mean_ms": float(latencies.mean() * 1e3),
+        "rows_per_sec": float(len(latencies) * rows_per_call / total) if total > 0 else 0.0,
+    }
+
+def time_calls(func, args_list, warmup: int = 20) -> list:
+    """Per-call wall time for func(*args) over args_list, after a short warmup"""
+    for args in args_list[:warmup]:
+        func(*args)
+    latencies = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+def make_payloads(n: int) -> list:
+    """Realistic /predict payloads"""
+    from train_model import generate_synthetic_data
+    df = generate_synthetic_data(n).drop(columns=['Approved'])
+    payloads = df.to_dict('records')
+    for i, payload in enumerate(payloads):
+        payload['LoanID'] = f"BENCH-{i}"
+        for col in ('HasMortgage', 'HasDependents', 'HasCoSigner'):
+            payload[col] = bool(payload[col])
+    return payloads
+
+def bench_predictor(predictor, payloads, batch_sizes, iterations: int) -> dict:
+    results = {}
+    single = payloads[:iterations]
+
+    from models import LoanApplication, PredictionResponse
+    bodies = [(json.dumps(p).encode(),) for p in single]
+    results["validate_request"] = summarize(time_calls(LoanApplication.model_validate_json, bodies))
+    results["serialize_response"] = summarize(time_calls(
+        lambda p: PredictionResponse(prediction=1, probability=0.5, loan_id=p['LoanID']).model_dump_json(),
+        [(p,) for p in single]
+    ))
+    results["preprocess_input"] = summarize(time_calls(predictor.preprocess_input, [(p,) for p in single]))
+    results["encode"] = summarize(time_calls(predictor.encoder.encode, [(p,) for p in single]))
+    results["explain_single"] = summarize(time_calls(predictor.explain, [(p,) for p in single]))
+    results.update(bench_scoring(predictor, payloads, batch_sizes, iterations))
+    return results
+
+def bench_scoring(predictor, payloads, batch_sizes, iterations: int, suffix: str = "") -> dict:
+    """Single-row latency and batch throughput of predict / predict_many"""
+    results = {}
+    results[f"predict_single{suffix}"] = summarize(time_calls(predictor.predict, [(p,) for p in payloads[:iterations]]))
+
+    for batch_size in batch_sizes:
+        batches = [
+            (payloads[start:start + batch_size],)
+            for start in range(0, len(payloads) - batch_size + 1, batch_size)
+        ]
+        # Keep large batch sizes from dominating the run time
+        batches = (batches * (1 + 20 // max(len(batches), 1)))[:max(20, iterations // batch_size)]
+        results[f"predict_many_{batch_size}{suffix}"] = summarize(
+            time_calls(predictor.predict_many, batches, warmup=2), rows_per_call=batch_size
+        )
+    return results
+
+async def _bench_endpoint(payloads, concurrency: int, microbatch: bool = False) -> dict:
+    import httpx
+    import main
+
+    main.MICROBATCH_ENABLED = microbatch
+    await main.startup_event()
+    await main.model_load_task
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for payload in payloads[:20]:
+                await client.post("/predict", json=payload)
+
+            latencies = []
+            errors = 0
+            queue = asyncio.Queue()
+            for payload in payloads:
+                queue.put_nowait(payload)
+
+            async def worker():
+                nonlocal errors
+                while not queue.empty():
+                    payload = queue.get_nowait()
+                    started = time.perf_counter()
+                    response = await client.post("/predict", json=payload)
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        errors += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+    finally:
+        await main.shutdown_event()
+        main.micro_batcher = None
+
+    result = summarize(latencies)
+    # Wall-clock throughput across concurrent clients
+    result["rows_per_sec"] = len(latencies) / elapsed
+    result["concurrency"] = concurrency
+    result["errors"] = errors
+    return result
+
+def bench_endpoint(payloads, concurrency_levels, microbatch: bool = False) -> dict:
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        print("httpx not installed, skipping end-to-end /predict benchmark")
+        return {}
+    results = {
+        f"endpoint_predict_c{concurrency}": asyncio.run(_bench_endpoint(payloads, concurrency))
+        for concurrency in concurrency_levels
+    }
+    if microbatch:
+        for concurrency in concurrency_levels:
+            results[f"endpoint_predict_c{concurrency}_microbatch"] = asyncio.run(
+                _bench_endpoint(payloads, concurrency, microbatch=True)
+            )
+    return results
+
+def environment_info() -> dict:
+    info = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "available_cpus": available_cpus(),
+    }
+    try:
+        info["git_commit"] = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        info["git_commit"] = None
+    try:
+        import xgboost
+        info["xgboost"] = xgboost.__version__
+    except ImportError:
+        info["xgboost"] = None
+    return info
+
+def print_results(results: dict, baseline: dict = None):
+    print(f"{'benchmark':<34}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rows/sec':>14}{'vs base':>10}")
+    for name, stats in results.items():
+        change = ""
+        if baseline and name in baseline and baseline[name]["rows_per_sec"]:
+            change = f"{stats['rows_per_sec'] / baseline[name]['rows_per_sec']:.2f}x"
+        print(f"{name:<34}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}"
+              f"{stats['p99_ms']:>10.3f}{stats['rows_per_sec']:>14,.0f}{change:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Credit Path AI prediction path")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write JSON results")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--iterations", type=int, default=2000, help="Single-row calls per benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--endpoint-requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--skip-endpoint", action="store_true")
+    parser.add_argument("--microbatch", action="store_true", help="Also run the endpoint benchmark with micro-batching")
+    args = parser.parse_args()
+
+    # End-to-end runs write to a throwaway SQLite database, never DATABASE_URL
+    db_dir = tempfile.mkdtemp(prefix="creditpath-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from prediction import LoanPredictor
+
+    payloads = make_payloads(max(args.iterations, max(args.batch_sizes), args.endpoint_requests))
+    predictor = LoanPredictor(engine='xgboost')
+
+    results = bench_predictor(predictor, payloads, args.batch_sizes, args.iterations)
+    # The compiled NumPy tree engine (tree_engine.py) on the same payloads
+    results.update(bench_scoring(LoanPredictor(engine='numpy'), payloads, args.batch_sizes,
+                                 args.iterations, suffix="_numpy"))
+    if not args.skip_endpoint:
+        results.update(bench_endpoint(payloads[:args.endpoint_requests], args.concurrency, args.microbatch))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)["results"]
+
+    print_results(results, baseline)
+
+    with open(args.output, 'w') as f:
+        json.dump({"environment": environment_info(), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
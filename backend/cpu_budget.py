@@ -0,0 +1,42 @@
+"""How many processes and threads the CPUs this container may use can take.
+
+os.cpu_count() is the host's core count; inside a container the CPU quota
+is usually far smaller. Every default below starts from available_cpus()
+and splits it so that gunicorn workers x inference threads x XGBoost
+threads stays within it, instead of multiplying past it.
+"""
+import math
+import os
+
+def available_cpus() -> int:
+    """CPUs this process may actually use: scheduler affinity, capped by a cgroup v2 quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # cgroup v2 CPU quota, e.g. "50000 100000" for half a core
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+def web_workers() -> int:
+    """Server processes sharing the CPUs (gunicorn_conf.py exports WEB_CONCURRENCY)"""
+    return max(int(os.environ.get("WEB_CONCURRENCY", 1)), 1)
+
+def inference_workers() -> int:
+    """Inference pool threads per process: INFERENCE_WORKERS, else this process's share of the CPUs"""
+    if os.environ.get("INFERENCE_WORKERS"):
+        return max(int(os.environ["INFERENCE_WORKERS"]), 1)
+    return max(1, available_cpus() // web_workers())
+
+def xgb_nthread() -> int:
+    """XGBoost threads per call: XGB_NTHREAD, else what is left once workers and
+    pool threads are counted (usually 1; the pool provides the parallelism)"""
+    if os.environ.get("XGB_NTHREAD"):
+        return int(os.environ["XGB_NTHREAD"])
+    return max(1, available_cpus() // (web_workers() * inference_workers()))
@@ -1,56 +1,195 @@
-import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-# If no database URL, create a dummy one for local testing
-if not DATABASE_URL:
-    DATABASE_URL = "sqlite:///./test.db"
-    print("⚠️ Using SQLite for local testing")
-
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-class Prediction(Base):
-    __tablename__ = "predictions"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    loan_id = Column(String(100), unique=True, index=True)
-    prediction_result = Column(Boolean)
-    confidence = Column(Float)
-    age = Column(Integer)
-    income = Column(Float)
-    loan_amount = Column(Float)
-    credit_score = Column(Integer)
-    months_employed = Column(Integer)
-    num_credit_lines = Column(Integer)
-    interest_rate = Column(Float)
-    loan_term = Column(Integer)
-    dti_ratio = Column(Float)
-    education = Column(String(50))
-    employment_type = Column(String(50))
-    marital_status = Column(String(50))
-    has_mortgage = Column(Boolean)
-    has_dependents = Column(Boolean)
-    loan_purpose = Column(String(50))
-    has_cosigner = Column(Boolean)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-def create_tables():
-    Base.metadata.create_all(bind=engine)
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+import os
+import threading
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Float, Boolean, Date, DateTime, Index
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Database configuration
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# If no database URL, create a dummy one for local testing
+if not DATABASE_URL:
+    DATABASE_URL = "sqlite:///./test.db"
+    print("⚠️ Using SQLite for local testing")
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+# Connection pool counters, updated from pool events
+pool_stats = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidated": 0}
+_pool_stats_lock = threading.Lock()
+
+def _count(key):
+    with _pool_stats_lock:
+        pool_stats[key] += 1
+
+def make_engine(url):
+    """Create a tuned engine from environment configuration.
+
+    DB_POOL_SIZE / DB_MAX_OVERFLOW size the pool (size it against worker and
+    thread count), DB_POOL_TIMEOUT bounds the wait for a free connection,
+    DB_POOL_RECYCLE and DB_POOL_PRE_PING guard against connections closed by
+    idle timeouts on managed Postgres, and DB_STATEMENT_TIMEOUT_MS sets a
+    server-side statement timeout. SQLite gets WAL mode and cross-thread use.
+    """
+    is_sqlite = url.startswith("sqlite")
+    kwargs = {
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "echo": _env_bool("DB_ECHO", False),
+    }
+    connect_args = {}
+
+    if is_sqlite:
+        # Sessions are used from the writer and request threads
+        connect_args["check_same_thread"] = False
+        connect_args["timeout"] = float(os.getenv("SQLITE_BUSY_TIMEOUT", 30))
+
+    # In-memory SQLite uses a singleton pool that takes no sizing arguments
+    if not (is_sqlite and ":memory:" in url):
+        kwargs.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        )
+
+    statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+    if statement_timeout_ms and url.startswith("postgresql"):
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+
+    new_engine = create_engine(url, connect_args=connect_args, **kwargs)
+
+    if is_sqlite:
+        @event.listens_for(new_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
+
+    event.listen(new_engine, "connect", lambda *args: _count("connects"))
+    event.listen(new_engine, "checkout", lambda *args: _count("checkouts"))
+    event.listen(new_engine, "checkin", lambda *args: _count("checkins"))
+    event.listen(new_engine, "invalidate", lambda *args: _count("invalidated"))
+
+    return new_engine
+
+def pool_status():
+    """Current pool usage plus lifetime event counters"""
+    pool = engine.pool
+    with _pool_stats_lock:
+        status = dict(pool_stats)
+    status["pool_class"] = type(pool).__name__
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    return status
+
+engine = make_engine(DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+class Prediction(Base):
+    __tablename__ = "predictions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    loan_id = Column(String(100), unique=True, index=True)
+    prediction_result = Column(Boolean)
+    confidence = Column(Float)
+    age = Column(Integer)
+    income = Column(Float)
+    loan_amount = Column(Float)
+    credit_score = Column(Integer)
+    months_employed = Column(Integer)
+    num_credit_lines = Column(Integer)
+    interest_rate = Column(Float)
+    loan_term = Column(Integer)
+    dti_ratio = Column(Float)
+    education = Column(String(50))
+    employment_type = Column(String(50))
+    marital_status = Column(String(50))
+    has_mortgage = Column(Boolean)
+    has_dependents = Column(Boolean)
+    loan_purpose = Column(String(50))
+    has_cosigner = Column(Boolean)
+    model_version = Column(String(50))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Keyset pagination and date-range scans on /predictions
+        Index("ix_predictions_created_at_id", "created_at", "id"),
+        # Outcome-filtered history, same ordering
+        Index("ix_predictions_result_created_at_id", "prediction_result", "created_at", "id"),
+    )
+
+class PredictionRollup(Base):
+    """Per day, loan purpose and employment type totals of the predictions table.
+
+    Kept in step with predictions by the audit writer (see prediction_rollups.py),
+    so dashboards aggregate a few rows per day instead of scanning history.
+    """
+    __tablename__ = "prediction_rollups"
+    
+    day = Column(Date, primary_key=True)
+    loan_purpose = Column(String(50), primary_key=True)
+    employment_type = Column(String(50), primary_key=True)
+    prediction_count = Column(Integer, nullable=False, default=0)
+    approved_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+
+def create_tables():
+    """Create missing tables; cheap, and safe from every worker"""
+    Base.metadata.create_all(bind=engine)
+
+def upgrade_tables():
+    """Add columns and indexes introduced after a table was first created.
+
+    create_all only creates missing tables, so existing deployments pick up
+    new nullable columns and indexes here. Index builds on a large table take
+    a while, so this runs once per deploy (python database.py, or the gunicorn
+    master; see gunicorn_conf.py), not from every worker. On Postgres indexes
+    are built CONCURRENTLY so writes continue, and every statement is
+    IF NOT EXISTS so a rerun or a concurrent run is harmless.
+    """
+    is_postgres = engine.dialect.name == "postgresql"
+    table = Prediction.__tablename__
+    inspector = inspect(engine)
+    existing_columns = {column["name"] for column in inspector.get_columns(table)}
+    existing_indexes = {index["name"] for index in inspector.get_indexes(table)}
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for column in Prediction.__table__.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=engine.dialect)
+                if_not_exists = "IF NOT EXISTS " if is_postgres else ""
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {if_not_exists}{column.name} {column_type}"))
+        for index in Prediction.__table__.indexes:
+            if index.name in existing_indexes:
+                continue
+            unique = "UNIQUE " if index.unique else ""
+            concurrently = "CONCURRENTLY " if is_postgres else ""
+            columns = ", ".join(column.name for column in index.columns)
+            connection.execute(text(f"CREATE {unique}INDEX {concurrently}IF NOT EXISTS {index.name} ON {table} ({columns})"))
+
+def migrate():
+    """Create missing tables and apply schema upgrades"""
+    create_tables()
+    upgrade_tables()
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    # Schema migration step, e.g. before starting the API: python database.py
+    migrate()
+    print("✅ Database schema is up to date")
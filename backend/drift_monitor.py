@@ -0,0 +1,334 @@
+"""Streaming drift monitoring of live predictions against the training data.
+
+train_xgboost_model saves reference_profile.json next to the model: per
+feature bin edges and proportions (or category proportions), quantiles,
+and the same for the score on the held-out test set. DriftMonitor keeps
+matching constant-memory statistics over live traffic and reports the
+Population Stability Index (PSI) per feature without touching the database.
+
+Usage (from backend/), to write a profile for an existing model:
+    python drift_monitor.py --model xgboost_model.json
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from feature_encoder import CATEGORICAL_COLUMNS
+
+REFERENCE_PROFILE_FILE = "reference_profile.json"
+DEFAULT_BINS = 10
+DEFAULT_QUANTILES = (0.5, 0.9)
+SCORE_EDGES = [i / 10 for i in range(1, 10)]
+# PSI rules of thumb: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_MODERATE = 0.1
+PSI_DRIFT = 0.25
+
+def build_reference_profile(X, scores, label_encoders: Dict[str, List[str]],
+                            bins: int = DEFAULT_BINS, quantiles=DEFAULT_QUANTILES) -> Dict:
+    """Reference statistics for an encoded training frame and model scores"""
+    features = {}
+    for col in X.columns:
+        values = X[col].to_numpy()
+        if col in CATEGORICAL_COLUMNS:
+            classes = label_encoders.get(col, [])
+            codes, counts = np.unique(values, return_counts=True)
+            features[col] = {
+                "type": "categorical",
+                "proportions": {classes[int(code)]: count / len(values) for code, count in zip(codes, counts)}
+            }
+        else:
+            # Decile edges of the training data, so every reference bin is populated
+            edges = np.unique(np.quantile(values.astype(np.float64), np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+            features[col] = _numeric_profile(values, edges, quantiles)
+    return {
+        "rows": int(len(X)),
+        "quantiles": list(quantiles),
+        "features": features,
+        "score": _numeric_profile(np.asarray(scores), SCORE_EDGES, quantiles)
+    }
+
+def _numeric_profile(values: np.ndarray, edges: List[float], quantiles) -> Dict:
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+    return {
+        "type": "numeric",
+        "edges": list(edges),
+        "proportions": (counts / len(values)).tolist(),
+        "quantiles": {str(q): float(np.quantile(values, q)) for q in quantiles}
+    }
+
+def save_reference_profile(profile: Dict, path: str = REFERENCE_PROFILE_FILE):
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+def population_stability_index(expected: List[float], actual: List[float], epsilon: float = 1e-4) -> float:
+    """PSI between two binned distributions given as proportions"""
+    psi = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e, epsilon)
+        a = max(a, epsilon)
+        psi += (a - e) * math.log(a / e)
+    return psi
+
+def psi_status(psi: float) -> str:
+    if psi < PSI_MODERATE:
+        return "stable"
+    return "moderate" if psi < PSI_DRIFT else "drift"
+
+class P2Quantile:
+    """Streaming quantile estimate in constant memory (the P-squared algorithm of Jain & Chlamtac)"""
+
+    __slots__ = ("p", "heights", "positions", "steps", "initial", "increments")
+
+    def __init__(self, p: float):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.steps = 0
+        # Desired marker positions are initial + steps * increments
+        self.initial = (1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5)
+        self.increments = (0, p / 2, p, (1 + p) / 2, 1)
+
+    def add(self, x: float):
+        q = self.heights
+        if len(q) < 5:
+            bisect.insort(q, x)
+            return
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 1
+        elif x >= q[4]:
+            q[4] = x
+            k = 4
+        else:
+            k = bisect.bisect_right(q, x)
+        for i in range(k, 5):
+            n[i] += 1
+        self.steps += 1
+        steps = self.steps
+        initial = self.initial
+        increments = self.increments
+        # Move the three middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = initial[i] + steps * increments[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] += d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def value(self) -> Optional[float]:
+        q = self.heights
+        if not q:
+            return None
+        if len(q) < 5:
+            return q[min(len(q) - 1, int(round(self.p * (len(q) - 1))))]
+        return q[2]
+
+class _NumericStream:
+    __slots__ = ("edges", "counts", "quantiles")
+
+    def __init__(self, edges: List[float], quantiles):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.quantiles = [P2Quantile(q) for q in quantiles]
+
+    def add(self, value):
+        if value is None:
+            return
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+        for estimator in self.quantiles:
+            estimator.add(float(value))
+
+class DriftMonitor:
+    """Running histograms, category counts and quantile sketches for live traffic.
+
+    Memory is fixed by the reference profile (bins, categories seen, five
+    markers per quantile), however many predictions are observed. Statistics
+    cover this process since startup or the last reset(); under gunicorn each
+    worker keeps its own.
+    """
+
+    def __init__(self, profile: Optional[Dict], version: Optional[str] = None):
+        self.profile = profile
+        self.version = version
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def for_model(cls, model_path: str, version: Optional[str] = None) -> "DriftMonitor":
+        """Monitor using the reference profile saved next to model_path, if there is one"""
+        path = os.path.join(os.path.dirname(model_path), REFERENCE_PROFILE_FILE)
+        try:
+            with open(path, 'r') as f:
+                profile = json.load(f)
+        except FileNotFoundError:
+            profile = None
+        return cls(profile, version)
+
+    @property
+    def enabled(self) -> bool:
+        return self.profile is not None
+
+    def reset(self):
+        """Start a fresh observation window"""
+        with self._lock:
+            self.observed = 0
+            self._numeric = {}
+            self._categorical = {}
+            if self.profile is None:
+                self._score = None
+                return
+            quantiles = self.profile.get("quantiles", DEFAULT_QUANTILES)
+            for col, reference in self.profile["features"].items():
+                if reference["type"] == "categorical":
+                    self._categorical[col] = {}
+                else:
+                    self._numeric[col] = _NumericStream(reference["edges"], quantiles)
+            self._score = _NumericStream(self.profile["score"]["edges"], quantiles)
+
+    def observe(self, application: Dict, probability: float):
+        """Add one scored application"""
+        if self.profile is None:
+            return
+        with self._lock:
+            self._observe(application, probability)
+
+    def observe_many(self, applications: List[Dict], probabilities, chunk_size: int = 256):
+        """Add scored applications, releasing the lock between chunks so reports never wait long"""
+        if self.profile is None:
+            return
+        for start in range(0, len(applications), chunk_size):
+            with self._lock:
+                for application, probability in zip(applications[start:start + chunk_size],
+                                                    probabilities[start:start + chunk_size]):
+                    self._observe(application, probability)
+
+    def _observe(self, application: Dict, probability: float):
+        self.observed += 1
+        for col, stream in self._numeric.items():
+            stream.add(application.get(col))
+        for col, counts in self._categorical.items():
+            value = application.get(col)
+            counts[value] = counts.get(value, 0) + 1
+        self._score.add(float(probability))
+
+    def psi(self, min_observations: int = 1) -> Dict[str, float]:
+        """PSI per feature plus 'score'; empty until min_observations have been seen"""
+        with self._lock:
+            if self.profile is None or self.observed == 0 or self.observed < min_observations:
+                return {}
+            values = {col: self._numeric_report(col)["psi"] for col in self._numeric}
+            values.update({col: self._categorical_report(col)["psi"] for col in self._categorical})
+            values["score"] = self._stream_report(self._score, self.profile["score"])["psi"]
+        return values
+
+    def report(self, min_observations: int = 100) -> Dict:
+        """Drift summary for every feature and the score"""
+        if self.profile is None:
+            return {"available": False, "model_version": self.version,
+                    "reason": f"No {REFERENCE_PROFILE_FILE} saved with this model"}
+        with self._lock:
+            features = {col: self._numeric_report(col) for col in self._numeric}
+            features.update({col: self._categorical_report(col) for col in self._categorical})
+            score = self._stream_report(self._score, self.profile["score"]) if self.observed else None
+            observed = self.observed
+
+        drifted = sorted(
+            (col for col, report in features.items() if report["status"] == "drift"),
+            key=lambda col: -features[col]["psi"]
+        )
+        return {
+            "available": True,
+            "model_version": self.version,
+            "observed": observed,
+            "reference_rows": self.profile.get("rows"),
+            "sufficient_data": observed >= min_observations,
+            "max_psi": max((report["psi"] for report in features.values() if report["psi"] is not None), default=None),
+            # PSI over a handful of rows is noise; don't flag anything during warm-up
+            "drifted_features": drifted if observed and observed >= min_observations else [],
+            "score": score,
+            "features": features
+        }
+
+    def _numeric_report(self, col: str) -> Dict:
+        return self._stream_report(self._numeric[col], self.profile["features"][col])
+
+    def _stream_report(self, stream: _NumericStream, reference: Dict) -> Dict:
+        total = sum(stream.counts)
+        proportions = [count / total for count in stream.counts] if total else None
+        psi = population_stability_index(reference["proportions"], proportions) if total else None
+        return {
+            "type": "numeric",
+            "psi": psi,
+            "status": psi_status(psi) if psi is not None else "no_data",
+            "edges": stream.edges,
+            "proportions": proportions,
+            "reference_proportions": reference["proportions"],
+            "quantiles": {str(estimator.p): estimator.value() for estimator in stream.quantiles},
+            "reference_quantiles": reference["quantiles"]
+        }
+
+    def _categorical_report(self, col: str) -> Dict:
+        reference = self.profile["features"][col]["proportions"]
+        counts = self._categorical[col]
+        total = sum(counts.values())
+        proportions = {str(value): count / total for value, count in counts.items()} if total else {}
+        psi = None
+        if total:
+            # Categories unseen in training count against the reference with a near-zero share
+            categories = list(reference) + [value for value in proportions if value not in reference]
+            psi = population_stability_index(
+                [reference.get(value, 0.0) for value in categories],
+                [proportions.get(value, 0.0) for value in categories]
+            )
+        return {
+            "type": "categorical",
+            "psi": psi,
+            "status": psi_status(psi) if psi is not None else "no_data",
+            "proportions": proportions,
+            "reference_proportions": reference
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the drift reference profile for a trained model")
+    parser.add_argument("--model", default="xgboost_model.json")
+    parser.add_argument("--output", default=None, help=f"Default: {REFERENCE_PROFILE_FILE} next to the model")
+    args = parser.parse_args()
+
+    import xgboost as xgb
+    from sklearn.model_selection import train_test_split
+    from train_model import generate_synthetic_data, preprocess_data
+
+    # Rebuild the data and split train_xgboost_model used
+    df, label_encoders = preprocess_data(generate_synthetic_data(10000), copy=False)
+    with open('feature_columns.json', 'r') as f:
+        feature_columns = json.load(f)
+    X_train, X_test, _, _ = train_test_split(
+        df[feature_columns], df['Approved'], test_size=0.2, random_state=42, stratify=df['Approved']
+    )
+    model = xgb.XGBClassifier()
+    model.load_model(args.model)
+    profile = build_reference_profile(
+        X_train, model.predict_proba(X_test)[:, 1],
+        {col: encoder.classes_.tolist() for col, encoder in label_encoders.items()}
+    )
+    output = args.output or os.path.join(os.path.dirname(args.model), REFERENCE_PROFILE_FILE)
+    save_reference_profile(profile, output)
+    print(f"Reference profile written to {output}")
+
+if __name__ == "__main__":
+    main()
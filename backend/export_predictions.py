@@ -0,0 +1,180 @@
+import argparse
+import csv
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+
+from sqlalchemy import func, select, Integer, Float, Boolean, String, DateTime
+
+from database import SessionLocal, Prediction
+
+EXPORT_COLUMNS = [column.name for column in Prediction.__table__.columns]
+DEFAULT_CHUNK_SIZE = 5000
+# Rows younger than this are left for the next export: with several writers,
+# transactions commit out of id order, so a lower id can still become visible
+# after a higher one. The grace must exceed the writers' flush delay
+EXPORT_GRACE_SECONDS = float(os.environ.get("EXPORT_GRACE_SECONDS", 60))
+
+def current_watermark(db, grace_seconds: float = EXPORT_GRACE_SECONDS) -> int:
+    """Highest id that is safe to export up to: max id of rows older than the grace period (0 if none)"""
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    return db.execute(select(func.max(Prediction.id)).where(Prediction.created_at < cutoff)).scalar() or 0
+
+def iter_prediction_chunks(db, since_id: int = 0, until_id: Optional[int] = None,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+    """Yield rows with since_id < id <= until_id in id order, chunk_size rows at a time.
+
+    Rows are read through a server-side cursor (stream_results), so only one
+    chunk is held in memory regardless of table size.
+    """
+    stmt = select(*Prediction.__table__.columns).where(Prediction.id > since_id)
+    if until_id is not None:
+        stmt = stmt.where(Prediction.id <= until_id)
+    stmt = stmt.order_by(Prediction.id)
+
+    result = db.execute(stmt, execution_options={"stream_results": True, "yield_per": chunk_size})
+    for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+def iter_csv(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    """Encode row chunks as CSV, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header only when there were no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after each row group"""
+
+    def __init__(self):
+        self._pending = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._pending.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._pending)
+        self._pending.clear()
+        return data
+
+def iter_parquet(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    """Encode row chunks as Parquet, one row group per chunk"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    # Fixed schema from the table definition, so all-NULL chunks keep their types
+    arrow_types = {
+        Integer: pa.int64(),
+        Float: pa.float64(),
+        Boolean: pa.bool_(),
+        String: pa.string(),
+        DateTime: pa.timestamp("us"),
+    }
+    schema = pa.schema([
+        (column.name, arrow_types[type(column.type)]) for column in Prediction.__table__.columns
+    ])
+
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in chunks:
+        columns = list(zip(*chunk))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def stream_export(fmt: str, since_id: int = 0, until_id: Optional[int] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encoded export bytes for one watermark range, using its own session"""
+    encoders = {"csv": iter_csv, "parquet": iter_parquet}
+    if fmt not in encoders:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    db = SessionLocal()
+    try:
+        yield from encoders[fmt](iter_prediction_chunks(db, since_id, until_id, chunk_size))
+    finally:
+        db.close()
+
+def read_watermark(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r') as f:
+        return int(f.read().strip() or 0)
+
+def write_watermark(path: str, watermark: int):
+    # Write-then-rename so a crash never leaves a half-written watermark
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(str(watermark))
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export prediction history to CSV or Parquet")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--output", required=True, help="Destination file")
+    parser.add_argument("--since-id", type=int, default=None,
+                        help="Export rows with id greater than this (overrides the watermark file)")
+    parser.add_argument("--watermark-file", default=None,
+                        help="File holding the last exported id; updated after a successful run")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--grace-seconds", type=float, default=EXPORT_GRACE_SECONDS,
+                        help="Leave rows newer than this for the next run")
+    args = parser.parse_args()
+
+    since_id = args.since_id
+    if since_id is None:
+        since_id = read_watermark(args.watermark_file) if args.watermark_file else 0
+
+    db = SessionLocal()
+    try:
+        until_id = current_watermark(db, args.grace_seconds)
+    finally:
+        db.close()
+
+    if until_id <= since_id:
+        print(f"No new predictions since id {since_id}")
+        return
+
+    started = time.perf_counter()
+    written = 0
+    tmp_output = f"{args.output}.partial"
+    with open(tmp_output, 'wb') as f:
+        for data in stream_export(args.format, since_id, until_id, args.chunk_size):
+            f.write(data)
+            written += len(data)
+    os.replace(tmp_output, args.output)
+
+    if args.watermark_file:
+        write_watermark(args.watermark_file, until_id)
+
+    elapsed = time.perf_counter() - started
+    print(f"Exported ids ({since_id}, {until_id}] to {args.output}: "
+          f"{written / 1e6:.1f} MB in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes with orjson when available (numpy arrays included)"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_to_builtin, separators=(",", ":")).encode()
+
+def _to_builtin(value):
+    # numpy scalars and arrays in the stdlib fallback
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, falling back to the stdlib encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
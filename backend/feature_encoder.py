@@ -0,0 +1,108 @@
+import numpy as np
+import threading
+from typing import Dict, List
+
+CATEGORICAL_COLUMNS = ['Education', 'EmploymentType', 'MaritalStatus', 'LoanPurpose']
+
+class FeatureEncoder:
+    """Precompiled application -> feature vector encoder.
+
+    Built once from the feature column order and label encoder classes, so
+    encoding a request is a fixed walk over column offsets with dict lookups
+    for categories. Produces the same values as LoanPredictor.preprocess_input
+    without going through pandas.
+    """
+
+    def __init__(self, feature_columns: List[str], label_encoders: Dict[str, List[str]]):
+        self.feature_columns = list(feature_columns)
+        self.n_features = len(self.feature_columns)
+
+        # (column name, category -> code lookup or None for numeric columns),
+        # indexed by the column's offset in the model's feature vector
+        self.columns = []
+        for col in self.feature_columns:
+            if col in CATEGORICAL_COLUMNS:
+                classes = label_encoders.get(col, [])
+                self.columns.append((col, {label: code for code, label in enumerate(classes)}))
+            else:
+                self.columns.append((col, None))
+
+        self._local = threading.local()
+
+    def buffer(self) -> np.ndarray:
+        """Preallocated single-row float32 buffer, one per thread"""
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None:
+            buf = np.zeros((1, self.n_features), dtype=np.float32)
+            self._local.buffer = buf
+        return buf
+
+    def row_values(self, application: Dict) -> list:
+        """Encoded feature values for one application, in model column order"""
+        values = []
+        for col, codes in self.columns:
+            if codes is None:
+                values.append(application.get(col, 0))
+            else:
+                # Unseen or missing categories map to code 0
+                values.append(codes.get(application.get(col), 0))
+        return values
+
+    def encode(self, application: Dict) -> np.ndarray:
+        """Encode one application into this thread's preallocated buffer.
+
+        The returned array is reused by the next call on the same thread.
+        """
+        buf = self.buffer()
+        buf[0] = self.row_values(application)
+        return buf
+
+    def encode_frame(self, df) -> np.ndarray:
+        """Encode a DataFrame of applications column by column, without per-row Python"""
+        import pandas as pd
+
+        X = np.zeros((len(df), self.n_features), dtype=np.float32)
+        for j, (col, codes) in enumerate(self.columns):
+            if col not in df.columns:
+                continue
+            if codes is None:
+                X[:, j] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+            else:
+                # Categorical codes follow the encoder's class order; unseen -> -1 -> 0
+                encoded = pd.Categorical(df[col], categories=list(codes)).codes
+                X[:, j] = np.where(encoded < 0, 0, encoded)
+        return X
+
+    def encode_many(self, applications: List[Dict]) -> np.ndarray:
+        """Encode a batch of applications into one contiguous float32 matrix"""
+        X = np.empty((len(applications), self.n_features), dtype=np.float32)
+        for j, (col, codes) in enumerate(self.columns):
+            if codes is None:
+                X[:, j] = [app.get(col, 0) for app in applications]
+            else:
+                X[:, j] = [codes.get(app.get(col), 0) for app in applications]
+        return X
+
+    def encode_grid(self, application: Dict, grid: Dict[str, List]) -> np.ndarray:
+        """Encode every combination of grid values applied to one base application.
+
+        The base row is encoded once and tiled, then only the grid columns are
+        overwritten. Rows follow itertools.product(*grid.values()) order.
+        """
+        base = np.asarray(self.row_values(application), dtype=np.float32)
+        offsets = {col: j for j, (col, _) in enumerate(self.columns)}
+        axes = []
+        for col, values in grid.items():
+            if col not in offsets:
+                raise KeyError(f"Unknown feature column {col}")
+            codes = self.columns[offsets[col]][1]
+            if codes is not None:
+                values = [codes.get(value, 0) for value in values]
+            axes.append(np.asarray(values, dtype=np.float32))
+
+        n_rows = int(np.prod([len(axis) for axis in axes])) if axes else 1
+        X = np.tile(base, (n_rows, 1))
+        if axes:
+            for col, mesh in zip(grid, np.meshgrid(*axes, indexing='ij')):
+                X[:, offsets[col]] = mesh.ravel()
+        return X
@@ -0,0 +1,51 @@
+# Production serving: gunicorn -c gunicorn_conf.py main:app
+#
+# The app (and, with PRELOAD_MODEL, the model and encoders) is loaded once in
+# the master process before forking, so workers share those pages
+# copy-on-write instead of each holding a private copy. XGBoost threads are
+# split across workers via WEB_CONCURRENCY (see cpu_budget.py).
+import gc
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cpu_budget import available_cpus
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+# Every worker holds its own app state (and, after a hot reload, its own model
+# copy), so without WEB_CONCURRENCY the count is capped to fit small instances
+MAX_DEFAULT_WORKERS = int(os.environ.get("MAX_DEFAULT_WORKERS", 2))
+workers = int(os.environ.get("WEB_CONCURRENCY", min(available_cpus(), MAX_DEFAULT_WORKERS)))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("WORKER_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("WORKER_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Workers read this to size their XGBoost and inference thread pools
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+def on_starting(server):
+    import main
+    # Schema upgrades once, here, rather than in every worker's startup
+    if main.DATABASE_AVAILABLE and main.migrate_on_startup():
+        import database
+        database.migrate()
+        # Don't hand the master's pooled connections to the forked workers
+        database.engine.dispose()
+        server.log.info("Database schema upgraded")
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "false"
+
+    if os.environ.get("PRELOAD_MODEL", "true").lower() not in ("1", "true", "yes"):
+        return
+    import prediction
+    if not main.ensure_model_exists():
+        server.log.warning("No model to preload; workers will load it themselves")
+        return
+    # No warm-up prediction in the master: OpenMP's thread pool is not
+    # fork-safe once started, so each worker warms up after the fork
+    version = prediction.model_manager.reload(warm=False)
+    server.log.info(f"Preloaded model version {version} for {workers} workers")
+    # Keep the garbage collector from touching (and so copying) the shared objects
+    gc.freeze()
@@ -0,0 +1,321 @@
+"""Traffic capture and replay load testing for the prediction API.
+
+Capture: start the API with CAPTURE_TRAFFIC_PATH=traffic.jsonl and every
+(sampled, CAPTURE_SAMPLE_RATE) /predict and /predict/batch body is appended
+as one JSON line, with LoanID replaced by a keyed hash (secret
+CAPTURE_HASH_KEY; without it each process uses a random key). Lines are
+appended with single O_APPEND writes, so gunicorn workers can share a file.
+
+Replay (from backend/):
+    python load_test.py synthesize traffic.jsonl --requests 5000
+    python load_test.py replay traffic.jsonl --concurrency 32
+    python load_test.py replay traffic.jsonl --rate 300 --duration 60
+    python load_test.py replay traffic.jsonl --speed 2 --url http://localhost:8000
+
+Without --url the app runs in-process against a throwaway SQLite database,
+or the database given by --database (e.g. a local Postgres). --rate or
+--speed (captured arrival times) switch from closed-loop clients to
+open-loop arrivals, with latency measured from each request's scheduled
+start so a slow server can't hide queueing delay.
+
+Lines are {"offset": seconds, "path": ..., "body": ...}; bare /predict
+bodies are accepted too. The repo-root requests.jsonl is a work backlog,
+not traffic, and is rejected.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import random
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+class TrafficCapture:
+    """Appends sanitized request bodies to a JSONL file from a background thread"""
+
+    def __init__(self, path: str, sample_rate: float = 1.0, max_queue_size: int = 10000,
+                 hash_key: Optional[bytes] = None):
+        _check_traffic_file(path)
+        self.path = path
+        self.sample_rate = sample_rate
+        # LoanIDs are often guessable, so an unkeyed hash could be reversed by enumeration
+        self.hash_key = hash_key or os.environ.get("CAPTURE_HASH_KEY", "").encode() or secrets.token_bytes(32)
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.started = time.monotonic()
+        self.stats = {"captured": 0, "dropped": 0}
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def record(self, path: str, body):
+        """Queue one request body; never blocks the caller"""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        try:
+            self.queue.put_nowait((time.monotonic() - self.started, path, body))
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        # Every line goes out in one write() on an O_APPEND descriptor, so lines
+        # from several worker processes never split or interleave
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                offset, path, body = item
+                if isinstance(body, list):
+                    body = [sanitize(application, self.hash_key) for application in body]
+                else:
+                    body = sanitize(body, self.hash_key)
+                os.write(fd, (json.dumps({"offset": round(offset, 6), "path": path, "body": body}) + "\n").encode())
+                self.stats["captured"] += 1
+        finally:
+            os.close(fd)
+
+def sanitize(application: Dict, key: bytes) -> Dict:
+    """Copy of an application with the LoanID replaced by a keyed one-way hash"""
+    application = dict(application)
+    loan_id = str(application.get('LoanID', ''))
+    application['LoanID'] = "CAPTURED-" + hashlib.blake2b(loan_id.encode(), digest_size=12, key=key[:64]).hexdigest()
+    return application
+
+def _check_traffic_file(path: str):
+    # Refuse to append to (or replay) a JSONL file that isn't captured traffic
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'r') as f:
+        first = json.loads(f.readline())
+    if parse_record(first) is None:
+        raise ValueError(f"{path} does not look like captured traffic")
+
+def parse_record(record: Dict) -> Optional[Dict]:
+    """Normalized {"offset", "path", "body"} for a traffic line, or None if it isn't one"""
+    if isinstance(record, dict) and "body" in record and "path" in record:
+        return {"offset": float(record.get("offset", 0.0)), "path": record["path"], "body": record["body"]}
+    if isinstance(record, dict) and "LoanID" in record:
+        return {"offset": 0.0, "path": "/predict", "body": record}
+    return None
+
+def load_traffic(path: str) -> List[Dict]:
+    records = []
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = parse_record(json.loads(line))
+            if record is None:
+                raise ValueError(f"{path}:{line_number} is not a captured request")
+            records.append(record)
+    if not records:
+        raise ValueError(f"{path} has no requests")
+    return records
+
+def synthesize(path: str, n: int, batch_every: int = 0, batch_size: int = 100):
+    """Write n synthetic /predict requests (plus an occasional batch) in the capture format"""
+    from benchmark import make_payloads
+    payloads = make_payloads(n)
+    with open(path, 'w') as f:
+        for i, payload in enumerate(payloads):
+            if batch_every and i % batch_every == batch_every - 1:
+                start = max(0, i - batch_size + 1)
+                record = {"offset": 0.0, "path": "/predict/batch", "body": payloads[start:i + 1]}
+            else:
+                record = {"offset": 0.0, "path": "/predict", "body": payload}
+            f.write(json.dumps(record) + "\n")
+
+def report(latencies: List[float], statuses: Dict, elapsed: float, target_rate: Optional[float]) -> Dict:
+    total = sum(statuses.values())
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    latencies = np.asarray(latencies) * 1e3
+    result = {
+        "requests": total,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "status_counts": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "seconds": elapsed,
+        "throughput_rps": total / elapsed if elapsed > 0 else 0.0,
+        "target_rps": target_rate,
+    }
+    if len(latencies):
+        result.update({
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p90_ms": float(np.percentile(latencies, 90)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "max_ms": float(latencies.max()),
+            "mean_ms": float(latencies.mean()),
+        })
+    return result
+
+async def replay(client, records: List[Dict], concurrency: int, rate: Optional[float] = None,
+                 duration: Optional[float] = None, total: Optional[int] = None, poisson: bool = True,
+                 speed: Optional[float] = None) -> Dict:
+    """Send records (cycled) through client and measure latency.
+
+    Closed loop (rate and speed None): `concurrency` clients send back to back.
+    Open loop: requests start at `rate` per second, or at their captured
+    offsets sped up by `speed`, whatever the server does, with at most
+    `concurrency` in flight; latency counts from the scheduled start.
+    """
+    if speed is not None:
+        # Recorded timing replays the capture once, in order
+        records = sorted(records, key=lambda record: record["offset"])
+        total = min(total or len(records), len(records))
+    if total is None and duration is None:
+        total = len(records)
+    latencies = []
+    statuses = {}
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def send(record, scheduled):
+        try:
+            response = await client.post(record["path"], json=record["body"])
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        latencies.append(time.perf_counter() - scheduled)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    def more(sent):
+        if total is not None and sent >= total:
+            return False
+        return deadline is None or time.perf_counter() < deadline
+
+    started = time.perf_counter()
+    if rate is None and speed is None:
+        sent = 0
+
+        async def worker():
+            nonlocal sent
+            while more(sent):
+                record = records[sent % len(records)]
+                sent += 1
+                await send(record, time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    else:
+        in_flight = asyncio.Semaphore(concurrency)
+        tasks = []
+        sent = 0
+        next_start = started
+
+        async def limited(record, scheduled):
+            async with in_flight:
+                await send(record, scheduled)
+
+        while more(sent):
+            delay = next_start - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(limited(records[sent % len(records)], next_start)))
+            sent += 1
+            if speed is not None:
+                if sent < len(records):
+                    next_start = started + (records[sent]["offset"] - records[0]["offset"]) / speed
+            else:
+                next_start += random.expovariate(rate) if poisson else 1.0 / rate
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return report(latencies, statuses, elapsed, rate)
+
+async def replay_in_process(records: List[Dict], **kwargs) -> Dict:
+    """Replay against the app in this process (DATABASE_URL must already be set)"""
+    import httpx
+    import main
+
+    await main.startup_event()
+    await main.model_load_task
+    if not main.readiness["ready"]:
+        raise RuntimeError(f"App failed to start: {main.readiness['error']}")
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+            result = await replay(client, records, **kwargs)
+        result["audit_writer"] = main.prediction_writer.metrics() if main.prediction_writer is not None else None
+    finally:
+        await main.shutdown_event()
+    return result
+
+async def replay_url(url: str, records: List[Dict], **kwargs) -> Dict:
+    import httpx
+    limits = httpx.Limits(max_connections=kwargs["concurrency"])
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        return await replay(client, records, **kwargs)
+
+def print_report(result: Dict):
+    print(f"requests      {result['requests']:,} in {result['seconds']:.1f}s")
+    target = f" (target {result['target_rps']:,.0f})" if result.get('target_rps') else ""
+    print(f"throughput    {result['throughput_rps']:,.1f} req/s{target}")
+    if "p50_ms" in result:
+        print(f"latency ms    p50 {result['p50_ms']:.2f}  p90 {result['p90_ms']:.2f}  p95 {result['p95_ms']:.2f}  "
+              f"p99 {result['p99_ms']:.2f}  max {result['max_ms']:.2f}")
+    print(f"errors        {result['errors']:,} ({result['error_rate']:.2%})  statuses {result['status_counts']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture and replay load tests for the Credit Path AI API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    synth_parser = subparsers.add_parser("synthesize", help="Write synthetic traffic in the capture format")
+    synth_parser.add_argument("output")
+    synth_parser.add_argument("--requests", type=int, default=5000)
+    synth_parser.add_argument("--batch-every", type=int, default=0, help="Make every Nth request a /predict/batch")
+    synth_parser.add_argument("--batch-size", type=int, default=100)
+
+    replay_parser = subparsers.add_parser("replay", help="Replay a traffic file and report latency")
+    replay_parser.add_argument("traffic", help="JSONL written by capture or synthesize")
+    replay_parser.add_argument("--url", default=None, help="Running server (default: in-process app)")
+    replay_parser.add_argument("--database", default="sqlite",
+                               help="In-process only: 'sqlite' for a throwaway file, or a database URL")
+    replay_parser.add_argument("--concurrency", type=int, default=16,
+                               help="Closed-loop clients, or max in flight with --rate")
+    replay_parser.add_argument("--rate", type=float, default=None, help="Open-loop arrivals per second")
+    replay_parser.add_argument("--uniform", action="store_true", help="Evenly spaced arrivals instead of Poisson")
+    replay_parser.add_argument("--speed", type=float, default=None,
+                               help="Open-loop at the captured arrival times, sped up by this factor")
+    replay_parser.add_argument("--requests", type=int, default=None, help="Requests to send (default: one pass)")
+    replay_parser.add_argument("--duration", type=float, default=None, help="Seconds to run")
+    replay_parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if args.command == "synthesize":
+        synthesize(args.output, args.requests, args.batch_every, args.batch_size)
+        print(f"Wrote {args.requests:,} requests to {args.output}")
+        return
+
+    records = load_traffic(args.traffic)
+    kwargs = dict(concurrency=args.concurrency, rate=args.rate, duration=args.duration,
+                  total=args.requests, poisson=not args.uniform, speed=args.speed)
+    if args.url:
+        result = asyncio.run(replay_url(args.url, records, **kwargs))
+    else:
+        if args.database == "sqlite":
+            db_dir = tempfile.mkdtemp(prefix="creditpath-load-")
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'load.db')}"
+        else:
+            os.environ["DATABASE_URL"] = args.database
+        result = asyncio.run(replay_in_process(records, **kwargs))
+
+    print_report(result)
+    result["settings"] = {key: value for key, value in vars(args).items() if key not in ("database", "command")}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
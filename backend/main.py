@@ -1,16 +1,35 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse, Response
 from pydantic import ValidationError
 import uvicorn
 import logging
 import os
 import sys
 import json
+import time
+import random
+import hmac
+import asyncio
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import List, Optional, Literal
 from sqlalchemy.orm import Session
 
+# Reference point for time-to-first-prediction
+PROCESS_STARTED = time.perf_counter()
+
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from metrics import REGISTRY, MetricsMiddleware, PREDICTIONS, observe_stage
+from models import (LoanApplication, PredictionResponse, BatchPredictionResponse, ExplanationResponse,
+                    BatchExplanationResponse, WhatIfRequest, WhatIfResponse, LOAN_APPLICATION_BATCH)
+from fast_json import FastJSONResponse
+from cpu_budget import inference_workers
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,7 +38,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Credit Path AI API",
     description="AI-powered loan approval prediction system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -31,11 +51,104 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route request latency histograms, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Fraction of predictions logged individually; the rest are only counted
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 0.01))
+
+def should_log_prediction() -> bool:
+    return LOG_SAMPLE_RATE > 0 and logger.isEnabledFor(logging.INFO) and random.random() < LOG_SAMPLE_RATE
+
+# Upper bound on applications accepted by a single /predict/batch call
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 10000))
+# Largest grid /predict/what-if will expand
+MAX_WHATIF_VARIANTS = int(os.environ.get("MAX_WHATIF_VARIANTS", 5000))
+
+# Bounded pool for model inference; XGBoost releases the GIL while scoring,
+# so the event loop stays free to accept other requests
+# Default to this process's share of the container's CPUs (see cpu_budget.py)
+INFERENCE_WORKERS = inference_workers()
+inference_executor = None
+
+async def run_inference(func, *args):
+    """Run a blocking predictor call on the inference pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_executor, func, *args)
+
+# Opt-in micro-batching of concurrent /predict calls (see micro_batcher.py)
+MICROBATCH_ENABLED = os.environ.get("MICROBATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+MICROBATCH_MAX_BATCH = int(os.environ.get("MICROBATCH_MAX_BATCH", 64))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", 2))
+micro_batcher = None
+
+# Live drift monitoring against the reference profile saved with the model
+# (see drift_monitor.py). Updating every sketch costs ~100us per row, so a
+# random 10% of rows is observed by default, on a single background thread
+# so large batches never stall the event loop
+DRIFT_SAMPLE_RATE = float(os.environ.get("DRIFT_SAMPLE_RATE", 0.1))
+DRIFT_MIN_OBSERVATIONS = int(os.environ.get("DRIFT_MIN_OBSERVATIONS", 100))
+drift_monitor = None
+drift_executor = None
+
+def observe_drift(predictor, applications: List[dict], probabilities):
+    """Sample rows for the drift monitor and update it off the event loop"""
+    if drift_executor is None or DRIFT_SAMPLE_RATE <= 0:
+        return
+    if DRIFT_SAMPLE_RATE < 1:
+        import numpy as np
+        # Sampled per row, so a 10k-row batch contributes ~10% of its rows
+        rows = np.flatnonzero(np.random.random(len(applications)) < DRIFT_SAMPLE_RATE)
+        if not len(rows):
+            return
+        applications = [applications[i] for i in rows]
+        probabilities = [probabilities[i] for i in rows]
+    drift_executor.submit(drift_monitor_for(predictor).observe_many, applications, probabilities)
+
+def drift_monitor_for(predictor):
+    """Drift monitor for the serving model version, replaced after a hot swap"""
+    global drift_monitor
+    if drift_monitor is None or drift_monitor.version != predictor.version:
+        from drift_monitor import DriftMonitor
+        drift_monitor = DriftMonitor.for_model(predictor.model_path, predictor.version)
+    return drift_monitor
+
+# Optional capture of sanitized request bodies for load_test.py replay
+CAPTURE_TRAFFIC_PATH = os.environ.get("CAPTURE_TRAFFIC_PATH")
+CAPTURE_SAMPLE_RATE = float(os.environ.get("CAPTURE_SAMPLE_RATE", 1.0))
+traffic_capture = None
+
+# Cold start: the port is bound immediately and the model is loaded (or,
+# failing that, trained) in the background. /health reports liveness and
+# /ready turns 200 only once a warm-up prediction has succeeded.
+COLD_START_TARGET_SECONDS = float(os.environ.get("COLD_START_TARGET_SECONDS", 10))
+TRAIN_ON_STARTUP = os.environ.get("TRAIN_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+readiness = {
+    "ready": False,
+    "stage": "starting",
+    "time_to_first_prediction_seconds": None,
+    "error": None
+}
+model_load_task = None
+
+# Versioned model registry (see model_registry.py); the serving model is
+# swapped in place when CURRENT changes or /admin/model/reload is called.
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", 5))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+model_manager = None
+
 # Auto-train model if not exists
 def ensure_model_exists():
-    model_path = 'xgboost_model.json'
-    if not os.path.exists(model_path):
+    from prediction import resolve_model_path
+    from model_registry import ModelRegistry
+    if resolve_model_path() is None and ModelRegistry().current_version() is None:
+        if not TRAIN_ON_STARTUP:
+            logger.error("❌ Model not found and TRAIN_ON_STARTUP is disabled")
+            return False
         logger.info("🤖 Model not found! Training new model...")
+        readiness["stage"] = "training_model"
         try:
             # Import here to avoid circular imports
             from train_model import train_xgboost_model
@@ -49,40 +162,163 @@ def ensure_model_exists():
     logger.info("✅ Model found and loaded!")
     return True
 
+def load_predictor():
+    """Load and warm the predictor off the event loop, then mark the app ready"""
+    global model_manager
+    try:
+        readiness["stage"] = "loading_model"
+        if not ensure_model_exists():
+            raise RuntimeError("No model artifact available")
+        
+        # Import here so the heavy ML stack loads after the port is bound.
+        # Under gunicorn the model may already have been loaded in the master
+        # (see gunicorn_conf.py); it is warmed here, after the fork, either way
+        from prediction import get_predictor, model_manager as manager, SAMPLE_APPLICATION
+        readiness["stage"] = "warming_up"
+        get_predictor().predict(SAMPLE_APPLICATION)
+        manager.start_watcher(MODEL_WATCH_INTERVAL)
+        
+        model_manager = manager
+        elapsed = time.perf_counter() - PROCESS_STARTED
+        readiness.update(ready=True, stage="ready", time_to_first_prediction_seconds=elapsed)
+        logger.info(f"✅ Credit Path AI API ready, time to first prediction {elapsed:.2f}s")
+        if elapsed > COLD_START_TARGET_SECONDS:
+            logger.warning(f"⚠️ Cold start took {elapsed:.2f}s, over the {COLD_START_TARGET_SECONDS:.0f}s target")
+    except Exception as e:
+        logger.error(f"❌ Failed to initialize predictor: {e}")
+        readiness.update(stage="failed", error=str(e))
+
+def current_predictor():
+    """The predictor serving right now, or None while the model is loading.
+
+    Handlers call this once per request so a concurrent hot swap can't mix
+    two model versions within one response.
+    """
+    return model_manager.predictor if model_manager is not None else None
+
 # Database setup
 try:
-    from database import create_tables, get_db, Prediction
+    from database import create_tables, upgrade_tables, get_db, SessionLocal, Prediction, pool_status
+    from audit_writer import PredictionWriter, prediction_record
+    from prediction_queries import fetch_predictions_page, parse_fields
+    from export_predictions import stream_export, current_watermark
+    from prediction_rollups import apply_rollup_deltas, ensure_rollups, fetch_stats, DIMENSIONS
     logger.info("✅ Database module loaded successfully!")
     DATABASE_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"❌ Database module not available: {e}")
     DATABASE_AVAILABLE = False
 
+# Buffered bulk writer for the predictions table
+prediction_writer = None
+if DATABASE_AVAILABLE:
+    prediction_writer = PredictionWriter(
+        SessionLocal,
+        Prediction.__table__,
+        batch_size=int(os.environ.get("AUDIT_BATCH_SIZE", 500)),
+        flush_interval=float(os.environ.get("AUDIT_FLUSH_INTERVAL", 1.0)),
+        max_queue_size=int(os.environ.get("AUDIT_QUEUE_SIZE", 10000)),
+        before_upsert=apply_rollup_deltas,
+        max_retries=int(os.environ.get("AUDIT_MAX_RETRIES", 5)),
+    )
+
+# Schema upgrades run once per deploy; the gunicorn master does them before
+# forking and turns this off for its workers (see gunicorn_conf.py)
+def migrate_on_startup() -> bool:
+    return os.environ.get("DB_MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# /predictions/stats answers 503 until this process has checked the rollups
+rollups_ready = False
+
+def prepare_database():
+    """Create tables, backfill rollups if needed, then start the writer; off the event loop.
+
+    Predictions offered meanwhile wait in the writer's buffer. The writer only
+    starts after this process has checked the rollups, so a one-time backfill
+    (serialized across workers by an exclusive lock) never races a flush.
+    """
+    global rollups_ready
+    try:
+        create_tables()
+        if migrate_on_startup():
+            upgrade_tables()
+        logger.info("✅ Database tables created successfully!")
+        db = SessionLocal()
+        try:
+            if ensure_rollups(db):
+                logger.info("✅ Prediction rollups backfilled from history")
+        finally:
+            db.close()
+        rollups_ready = True
+    except Exception as e:
+        logger.error(f"❌ Database preparation failed: {e}")
+    prediction_writer.start()
+
+# Component counters exposed as gauges on /metrics
+if prediction_writer is not None:
+    REGISTRY.register_gauges("creditpath_audit_writer", prediction_writer.metrics)
+if DATABASE_AVAILABLE:
+    REGISTRY.register_gauges("creditpath_db_pool", pool_status)
+def prediction_cache_metrics():
+    predictor = current_predictor()
+    if predictor is None or predictor.cache is None:
+        return {}
+    return predictor.cache.metrics()
+
+REGISTRY.register_gauges("creditpath_prediction_cache", prediction_cache_metrics)
+REGISTRY.register_gauges(
+    "creditpath_drift_psi",
+    lambda: drift_monitor.psi(DRIFT_MIN_OBSERVATIONS) if drift_monitor is not None else {}
+)
+REGISTRY.register_gauges("creditpath_microbatch", lambda: micro_batcher.metrics() if micro_batcher is not None else {})
+
 # Initialize app
 @app.on_event("startup")
 async def startup_event():
     logger.info("🚀 Starting Credit Path AI API...")
-    ensure_model_exists()
+    global inference_executor, drift_executor, micro_batcher, traffic_capture
+    inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+    # One thread: drift updates are serialized and never compete with each other for the monitor
+    drift_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="drift")
+    if CAPTURE_TRAFFIC_PATH:
+        from load_test import TrafficCapture
+        traffic_capture = TrafficCapture(CAPTURE_TRAFFIC_PATH, CAPTURE_SAMPLE_RATE)
+        logger.info(f"✅ Capturing traffic to {CAPTURE_TRAFFIC_PATH}")
+    if MICROBATCH_ENABLED:
+        from micro_batcher import MicroBatcher
+        micro_batcher = MicroBatcher(
+            inference_executor,
+            max_batch=MICROBATCH_MAX_BATCH,
+            max_wait=MICROBATCH_MAX_WAIT_MS / 1000,
+            max_in_flight=INFERENCE_WORKERS
+        )
+        logger.info(f"✅ Micro-batching enabled (max {MICROBATCH_MAX_BATCH} rows, {MICROBATCH_MAX_WAIT_MS:g} ms)")
     
-    # Create database tables if available
+    # Prepare the database in the background: a rollup backfill over a long
+    # history must not hold up startup (and the worker's heartbeat)
     if DATABASE_AVAILABLE:
-        try:
-            create_tables()
-            logger.info("✅ Database tables created successfully!")
-        except Exception as e:
-            logger.error(f"❌ Database table creation failed: {e}")
+        asyncio.get_running_loop().run_in_executor(None, prepare_database)
     
-    # Import here to avoid issues
-    try:
-        from prediction import get_predictor
-        global predictor
-        predictor = get_predictor()
-        logger.info("✅ Credit Path AI API started successfully!")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize predictor: {e}")
-        predictor = None
+    # Load the model in the background so startup never waits on it
+    global model_load_task
+    model_load_task = asyncio.get_running_loop().run_in_executor(None, load_predictor)
+    logger.info("✅ Credit Path AI API started, loading model...")
 
-predictor = None
+@app.on_event("shutdown")
+async def shutdown_event():
+    if model_manager is not None:
+        model_manager.stop_watcher()
+    # Flush buffered predictions before the process exits
+    if prediction_writer is not None:
+        prediction_writer.stop()
+    if inference_executor is not None:
+        inference_executor.shutdown(wait=True)
+    if drift_executor is not None:
+        drift_executor.shutdown(wait=False, cancel_futures=True)
+    global traffic_capture
+    if traffic_capture is not None:
+        traffic_capture.close()
+        traffic_capture = None
 
 @app.get("/")
 async def root():
@@ -94,118 +330,448 @@ async def root():
         "database_connected": DATABASE_AVAILABLE
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text-format metrics: request and stage latency histograms, counters, gauges"""
+    return PlainTextResponse(REGISTRY.expose(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed, 503 before"""
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness; see /ready for model readiness)"""
+    predictor = current_predictor()
     return {
         "status": "healthy",
         "model_loaded": predictor is not None,
+        "model_version": predictor.version if predictor is not None else None,
+        "ready": readiness["ready"],
+        "time_to_first_prediction_seconds": readiness["time_to_first_prediction_seconds"],
         "database_connected": DATABASE_AVAILABLE,
-        "backend": "Render"
+        "backend": "Render",
+        "audit_writer": prediction_writer.metrics() if prediction_writer is not None else None,
+        "database_pool": pool_status() if DATABASE_AVAILABLE else None,
+        "prediction_cache": predictor.cache.metrics() if predictor is not None and predictor.cache is not None else None,
+        "micro_batcher": micro_batcher.metrics() if micro_batcher is not None else None
     }
 
-@app.post("/predict")
-async def predict_loan(application: dict, db: Session = Depends(get_db) if DATABASE_AVAILABLE else None):
+def json_request_body(schema: dict) -> dict:
+    """OpenAPI request body for handlers that validate the raw body themselves"""
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+def validation_error(e: ValidationError) -> RequestValidationError:
+    """Same 422 response FastAPI gives for validation it runs itself"""
+    # FastAPI locates body errors under "body"
+    return RequestValidationError([
+        {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)
+    ])
+
+@app.post(
+    "/predict",
+    response_model=PredictionResponse,
+    openapi_extra=json_request_body(LoanApplication.model_json_schema())
+)
+async def predict_loan(request: Request):
     """Predict loan approval"""
+    # Parse and validate the raw body in one compiled pass; bad payloads get
+    # a 422 here instead of failing inside the encoder
+    body = await request.body()
     try:
-        if predictor is None:
-            raise HTTPException(status_code=503, detail="Prediction service unavailable")
+        application = LoanApplication.model_validate_json(body).__dict__
+    except ValidationError as e:
+        raise validation_error(e)
+    # Time from the request arriving to here: body read, parsing and validation
+    observe_stage("parse", time.perf_counter() - request.state.request_started)
+    if traffic_capture is not None:
+        traffic_capture.record("/predict", application)
+    
+    predictor = current_predictor()
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Prediction service unavailable")
+    
+    try:
+        # Make prediction off the event loop
+        if micro_batcher is not None:
+            prediction, probability = await micro_batcher.predict(predictor, application)
+        else:
+            prediction, probability = await run_inference(predictor.predict, application)
         
-        # Make prediction
-        prediction, probability = predictor.predict(application)
+        PREDICTIONS.inc(1, "predict", "approved" if prediction else "rejected")
+        observe_drift(predictor, [application], [probability])
+        if should_log_prediction():
+            logger.info("prediction loan_id=%s approved=%s probability=%.3f model_version=%s",
+                        application['LoanID'], bool(prediction), probability, predictor.version)
         
-        logger.info(f"Prediction made for loan {application.get('LoanID', 'unknown')}: "
-                   f"approved={bool(prediction)}, probability={probability:.3f}")
+        # 🆕 SAVE TO DATABASE if available, via the buffered bulk writer.
+        # "persist" is the request's cost (enqueueing, or waiting under
+        # backpressure); the write itself is the writer's "db_flush" stage
+        if prediction_writer is not None:
+            started = time.perf_counter()
+            record = prediction_record(application, prediction, probability, predictor.version)
+            if not prediction_writer.offer(record):
+                # Buffer full: wait for space off the event loop (backpressure)
+                await asyncio.get_running_loop().run_in_executor(None, prediction_writer.put, record)
+            observe_stage("persist", time.perf_counter() - started)
         
-        # 🆕 SAVE TO DATABASE if available
-        if DATABASE_AVAILABLE and db is not None:
-            try:
-                db_prediction = Prediction(
-                    loan_id=application.get('LoanID', 'unknown'),
-                    prediction_result=bool(prediction),
-                    confidence=float(probability),
-                    age=application.get('Age'),
-                    income=application.get('Income'),
-                    loan_amount=application.get('LoanAmount'),
-                    credit_score=application.get('CreditScore'),
-                    months_employed=application.get('MonthsEmployed'),
-                    num_credit_lines=application.get('NumCreditLines'),
-                    interest_rate=application.get('InterestRate'),
-                    loan_term=application.get('LoanTerm'),
-                    dti_ratio=application.get('DTIRatio'),
-                    education=application.get('Education'),
-                    employment_type=application.get('EmploymentType'),
-                    marital_status=application.get('MaritalStatus'),
-                    has_mortgage=application.get('HasMortgage', False),
-                    has_dependents=application.get('HasDependents', False),
-                    loan_purpose=application.get('LoanPurpose'),
-                    has_cosigner=application.get('HasCoSigner', False)
+        started = time.perf_counter()
+        body = PredictionResponse(
+            prediction=int(prediction),
+            probability=float(probability),
+            loan_id=application['LoanID'],
+            model_version=predictor.version,
+            saved_to_database=prediction_writer is not None
+        ).model_dump_json()
+        observe_stage("serialize", time.perf_counter() - started)
+        return Response(content=body, media_type="application/json")
+        
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post(
+    "/predict/batch",
+    response_model=BatchPredictionResponse,
+    openapi_extra=json_request_body({"type": "array", "items": LoanApplication.model_json_schema()})
+)
+async def predict_loan_batch(request: Request):
+    """Predict loan approval for many applications in one vectorized call"""
+    body = await request.body()
+    try:
+        applications = [application.__dict__ for application in LOAN_APPLICATION_BATCH.validate_json(body)]
+    except ValidationError as e:
+        raise validation_error(e)
+    observe_stage("parse", time.perf_counter() - request.state.request_started)
+    if traffic_capture is not None:
+        traffic_capture.record("/predict/batch", applications)
+    
+    predictor = current_predictor()
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Prediction service unavailable")
+    if len(applications) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(applications)} applications (max {MAX_BATCH_SIZE})"
+        )
+    
+    try:
+        predictions, probabilities = await run_inference(predictor.predict_many, applications)
+        
+        approved = int(predictions.sum())
+        PREDICTIONS.inc(approved, "predict_batch", "approved")
+        PREDICTIONS.inc(len(applications) - approved, "predict_batch", "rejected")
+        observe_drift(predictor, applications, probabilities)
+        if should_log_prediction():
+            logger.info("batch_prediction size=%d approved=%d model_version=%s",
+                        len(applications), approved, predictor.version)
+        
+        started = time.perf_counter()
+        response = FastJSONResponse({
+            "predictions": [
+                {
+                    "loan_id": application['LoanID'],
+                    "prediction": prediction,
+                    "probability": probability
+                }
+                for application, prediction, probability in zip(
+                    applications, predictions.tolist(), probabilities.tolist()
                 )
-                
-                db.add(db_prediction)
-                db.commit()
-                db.refresh(db_prediction)
-                
-                logger.info(f"✅ Prediction saved to database with ID: {db_prediction.id}")
-                
-            except Exception as db_error:
-                logger.error(f"❌ Database save failed: {db_error}")
-                # Don't crash the prediction if database fails
-                # Continue to return prediction to user
+            ],
+            "total": len(applications),
+            "model_version": predictor.version,
+            "saved_to_database": False
+        })
+        observe_stage("serialize", time.perf_counter() - started)
+        return response
+        
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post(
+    "/predict/explain",
+    response_model=ExplanationResponse,
+    openapi_extra=json_request_body(LoanApplication.model_json_schema())
+)
+async def explain_loan(request: Request, top_k: Optional[int] = Query(None, ge=1, description="Return only the k largest contributions")):
+    """Explain a loan decision with per-feature TreeSHAP contributions"""
+    body = await request.body()
+    try:
+        application = LoanApplication.model_validate_json(body).__dict__
+    except ValidationError as e:
+        raise validation_error(e)
+    observe_stage("parse", time.perf_counter() - request.state.request_started)
+    
+    predictor = current_predictor()
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Prediction service unavailable")
+    
+    try:
+        explanation = await run_inference(predictor.explain, application, top_k)
+        explanation["model_version"] = predictor.version
+        return explanation
         
+    except Exception as e:
+        logger.error(f"Explanation error: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post(
+    "/predict/explain/batch",
+    response_model=BatchExplanationResponse,
+    openapi_extra=json_request_body({"type": "array", "items": LoanApplication.model_json_schema()})
+)
+async def explain_loan_batch(request: Request, top_k: Optional[int] = Query(None, ge=1, description="Return only the k largest contributions")):
+    """Explain many loan decisions with a single TreeSHAP call"""
+    body = await request.body()
+    try:
+        applications = [application.__dict__ for application in LOAN_APPLICATION_BATCH.validate_json(body)]
+    except ValidationError as e:
+        raise validation_error(e)
+    observe_stage("parse", time.perf_counter() - request.state.request_started)
+    
+    predictor = current_predictor()
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Prediction service unavailable")
+    if len(applications) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(applications)} applications (max {MAX_BATCH_SIZE})"
+        )
+    
+    try:
+        explanations = await run_inference(predictor.explain_many, applications, top_k)
+        for explanation in explanations:
+            explanation["model_version"] = predictor.version
         return {
-            "prediction": int(prediction),
-            "probability": float(probability),
-            "loan_id": application.get('LoanID', 'unknown'),
-            "saved_to_database": DATABASE_AVAILABLE and db is not None
+            "explanations": explanations,
+            "total": len(explanations),
+            "model_version": predictor.version
         }
         
-    except ValidationError as e:
-        logger.error(f"Validation error: {e}")
-        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        logger.error(f"Prediction error: {e}")
+        logger.error(f"Batch explanation error: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/predict/what-if", response_model=WhatIfResponse)
+async def what_if_loan(request: WhatIfRequest):
+    """Approval surface for variations of one application, scored in one booster call.
+
+    Variants are not saved to the database.
+    """
+    predictor = current_predictor()
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Prediction service unavailable")
+    
+    grid = request.grid.values()
+    variants = 1
+    for values in grid.values():
+        variants *= len(values)
+    if variants > MAX_WHATIF_VARIANTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Grid too large: {variants} variants (max {MAX_WHATIF_VARIANTS})"
+        )
+    
+    try:
+        surface = await run_inference(predictor.what_if, request.application.__dict__, grid)
+        surface["model_version"] = predictor.version
+        return FastJSONResponse(surface)
+        
+    except Exception as e:
+        logger.error(f"What-if error: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def format_prediction_row(row) -> dict:
+    """JSON-ready dict for a projected predictions row"""
+    item = {}
+    for name, value in row.items():
+        if name == "prediction_result":
+            item["prediction"] = "Approved" if value else "Rejected"
+        elif name == "created_at":
+            item["created_at"] = value.isoformat() if value is not None else None
+        else:
+            item[name] = value
+    return item
+
 @app.get("/predictions")
-async def get_predictions(db: Session = Depends(get_db) if DATABASE_AVAILABLE else None):
-    """Get all predictions from database"""
+def get_predictions(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    start: Optional[datetime] = Query(None, description="Only predictions created at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only predictions created before this time"),
+    outcome: Optional[Literal["approved", "rejected"]] = None,
+    min_confidence: Optional[float] = Query(None, ge=0, le=1),
+    max_confidence: Optional[float] = Query(None, ge=0, le=1),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    db: Session = Depends(get_db) if DATABASE_AVAILABLE else None
+):
+    """Get predictions from database, newest first, one keyset page at a time"""
     if not DATABASE_AVAILABLE or db is None:
         raise HTTPException(status_code=503, detail="Database not available")
     
     try:
-        predictions = db.query(Prediction).order_by(Prediction.created_at.desc()).limit(50).all()
-        return {
-            "predictions": [
-                {
-                    "id": pred.id,
-                    "loan_id": pred.loan_id,
-                    "prediction": "Approved" if pred.prediction_result else "Rejected",
-                    "confidence": pred.confidence,
-                    "age": pred.age,
-                    "income": pred.income,
-                    "created_at": pred.created_at.isoformat()
-                }
-                for pred in predictions
-            ],
-            "total": len(predictions)
-        }
+        columns = parse_fields(fields)
+        page = fetch_predictions_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            start=start,
+            end=end,
+            outcome=None if outcome is None else outcome == "approved",
+            min_confidence=min_confidence,
+            max_confidence=max_confidence,
+            fields=columns
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching predictions: {e}")
         raise HTTPException(status_code=500, detail="Error fetching predictions")
+    
+    predictions = [format_prediction_row(row) for row in page["rows"]]
+    return {
+        "predictions": predictions,
+        "total": len(predictions),
+        "next_cursor": page["next_cursor"]
+    }
+
+@app.get("/predictions/stats")
+def get_prediction_stats(
+    group_by: Optional[str] = Query("loan_purpose", description="Comma-separated: day, loan_purpose, employment_type"),
+    start: Optional[date] = Query(None, description="First day included"),
+    end: Optional[date] = Query(None, description="First day excluded"),
+    db: Session = Depends(get_db) if DATABASE_AVAILABLE else None
+):
+    """Approval rate and mean confidence by day, loan purpose and employment type.
+
+    Served from the prediction_rollups table, so the cost depends on the number
+    of days and groups requested, not on the size of prediction history.
+    """
+    if not DATABASE_AVAILABLE or db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    if not rollups_ready:
+        raise HTTPException(status_code=503, detail="Prediction rollups are still being prepared")
+    
+    dimensions = [name.strip() for name in (group_by or "").split(",") if name.strip()]
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by fields: {', '.join(unknown)}")
+    
+    try:
+        return fetch_stats(db, dimensions, start=start, end=end)
+    except Exception as e:
+        logger.error(f"Error fetching prediction stats: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching prediction stats")
+
+@app.get("/predictions/export")
+def export_predictions(
+    format: Literal["csv", "parquet"] = "csv",
+    since_id: int = Query(0, ge=0, description="Export rows with id greater than this watermark"),
+    chunk_size: int = Query(5000, ge=100, le=100000)
+):
+    """Stream prediction history as CSV or Parquet in constant memory"""
+    if not DATABASE_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Database not available")
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    
+    # Pin the upper bound so the export is a consistent range; clients pass
+    # it back as since_id on the next run. The bound lags by
+    # EXPORT_GRACE_SECONDS so rows still being committed aren't skipped
+    db = SessionLocal()
+    try:
+        until_id = current_watermark(db)
+    finally:
+        db.close()
+    
+    media_types = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+    return StreamingResponse(
+        stream_export(format, since_id, until_id, chunk_size),
+        media_type=media_types[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="predictions_{since_id}_{until_id}.{format}"',
+            "X-Export-Watermark": str(until_id)
+        }
+    )
 
 @app.get("/model-info")
 async def model_info():
     """Get information about the loaded model"""
+    predictor = current_predictor()
     if predictor is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
     return {
         "model_type": "XGBoost",
+        "model_version": predictor.version,
+        "prediction_engine": predictor.engine,
         "feature_columns": predictor.feature_columns if hasattr(predictor, 'feature_columns') else [],
         "categorical_columns": list(predictor.label_encoders.keys()) if hasattr(predictor, 'label_encoders') else []
     }
 
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints need ADMIN_TOKEN configured and a matching X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/model", dependencies=[Depends(require_admin)])
+async def admin_model_status():
+    """Serving model version and the versions available in the registry"""
+    from model_registry import ModelRegistry
+    registry = ModelRegistry()
+    predictor = current_predictor()
+    return {
+        "serving_version": predictor.version if predictor is not None else None,
+        "registry_current": registry.current_version(),
+        "versions": registry.list_versions()
+    }
+
+@app.post("/admin/model/reload", dependencies=[Depends(require_admin)])
+async def admin_model_reload(version: Optional[str] = None):
+    """Load a model version (default: registry CURRENT) in the background and swap it in"""
+    if model_manager is None:
+        raise HTTPException(status_code=503, detail="Model not loaded yet")
+    # Only names the registry lists, never a path
+    if version is not None and version not in model_manager.registry.list_versions():
+        raise HTTPException(status_code=404, detail=f"Model version {version} not found")
+    
+    loop = asyncio.get_running_loop()
+    try:
+        # The old model keeps serving while the new one loads and warms; CURRENT
+        # is only repointed once the swap has succeeded, so the watcher and
+        # restarts never pick up a version that failed to load
+        serving_version = await loop.run_in_executor(
+            None, lambda: model_manager.reload(version, activate=version is not None)
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Model reload failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
+    
+    return {"serving_version": serving_version}
+
+@app.get("/monitoring/drift")
+async def drift_report():
+    """PSI of live traffic against the training profile, per feature and for the score"""
+    predictor = current_predictor()
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return drift_monitor_for(predictor).report(DRIFT_MIN_OBSERVATIONS)
+
+@app.post("/monitoring/drift/reset", dependencies=[Depends(require_admin)])
+async def drift_reset():
+    """Start a fresh drift observation window"""
+    predictor = current_predictor()
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    drift_monitor_for(predictor).reset()
+    return {"reset": True, "model_version": predictor.version}
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from metrics import MICROBATCH_SIZE, observe_stage
+from prediction_cache import PredictionCache
+
+class MicroBatcher:
+    """Coalesces concurrent single-application predictions into vectorized booster calls.
+
+    Requests are encoded on the event loop and queued. A batch is dispatched to
+    the executor as soon as the scorer is idle, `max_batch` rows are waiting,
+    or the oldest request has waited `max_wait` seconds. Under light load a
+    request therefore goes straight to the booster; under heavy load requests
+    pile up while the previous batch is scored and share the next call.
+    """
+
+    def __init__(self, executor=None, max_batch: int = 64, max_wait: float = 0.002,
+                 max_in_flight: int = 1):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        # (predictor, encoded row, cache key, future, enqueue time)
+        self._pending = []
+        self._in_flight = 0
+        self._timer = None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "rows": 0, "max_batch_rows": 0, "cache_hits": 0}
+
+    async def predict(self, predictor, application: Dict) -> tuple:
+        """(prediction, probability) for one application, scored with whatever else is waiting"""
+        started = time.perf_counter()
+        row = np.asarray(predictor.encoder.row_values(application), dtype=np.float32)
+        observe_stage('preprocess', time.perf_counter() - started)
+        self._count("requests")
+
+        key = None
+        if predictor.cache is not None:
+            key = PredictionCache.key(row)
+            cached = predictor.cache.get(key)
+            if cached is not None:
+                self._count("cache_hits")
+                return cached
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((predictor, row, key, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch or self._in_flight < self.max_in_flight:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._dispatch)
+        return await future
+
+    def metrics(self) -> Dict:
+        """Snapshot of batching counters"""
+        with self._lock:
+            snapshot = dict(self.stats)
+        snapshot["mean_batch_rows"] = snapshot["rows"] / snapshot["batches"] if snapshot["batches"] else 0.0
+        snapshot["pending"] = len(self._pending)
+        snapshot["in_flight"] = self._in_flight
+        snapshot["max_batch"] = self.max_batch
+        snapshot["max_wait_ms"] = self.max_wait * 1e3
+        return snapshot
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _dispatch(self):
+        # Runs on the event loop: hand everything waiting (up to max_batch) to the executor
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        self._in_flight += 1
+        asyncio.ensure_future(self._score(batch))
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._dispatch)
+
+    async def _score(self, batch: List[tuple]):
+        loop = asyncio.get_running_loop()
+        dispatched = time.perf_counter()
+        try:
+            # A hot swap can land mid-batch: score each model version's rows with that model
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[0]), []).append(item)
+            for items in groups.values():
+                predictor = items[0][0]
+                X = np.vstack([item[1] for item in items])
+                try:
+                    probabilities = await loop.run_in_executor(self.executor, self._predict_proba, predictor, X)
+                except Exception as e:
+                    for item in items:
+                        if not item[3].done():
+                            item[3].set_exception(e)
+                    continue
+                for (_, _, key, future, _), probability in zip(items, probabilities):
+                    result = (np.int64(probability > 0.5), probability)
+                    if key is not None:
+                        predictor.cache.put(key, result)
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            MICROBATCH_SIZE.observe(len(batch))
+            with self._lock:
+                self.stats["batches"] += 1
+                self.stats["rows"] += len(batch)
+                self.stats["max_batch_rows"] = max(self.stats["max_batch_rows"], len(batch))
+            observe_stage('batch_wait', dispatched - min(item[4] for item in batch))
+            # Rows that queued up while this batch was scored go next
+            if self._pending and self._in_flight < self.max_in_flight:
+                self._dispatch()
+
+    @staticmethod
+    def _predict_proba(predictor, X: np.ndarray) -> np.ndarray:
+        started = time.perf_counter()
+        probabilities = predictor.predict_proba_matrix(X)
+        observe_stage('booster', time.perf_counter() - started)
+        return probabilities
@@ -0,0 +1,133 @@
+import argparse
+import hashlib
+import os
+import shutil
+from typing import Dict, List, Optional
+
+MODEL_REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", "models")
+CURRENT_FILE = "CURRENT"
+MODEL_FILES = ["xgboost_model.ubj", "xgboost_model.json"]
+ARTIFACT_FILES = ["label_encoders.json", "feature_columns.json", "reference_profile.json"]
+
+def file_version(path: str) -> str:
+    """Short content hash, used as the version of artifacts outside the registry"""
+    digest = hashlib.blake2b(digest_size=6)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return f"sha-{digest.hexdigest()}"
+
+class ModelRegistry:
+    """Versioned model artifacts on disk.
+
+    Layout:
+        models/
+            CURRENT                 name of the active version
+            <version>/
+                xgboost_model.ubj   (and/or xgboost_model.json)
+                label_encoders.json
+                feature_columns.json
+                reference_profile.json  (optional, for drift monitoring)
+
+    CURRENT is replaced atomically, so readers never see a partial switch.
+    """
+
+    def __init__(self, root: str = MODEL_REGISTRY_DIR):
+        self.root = root
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.root)
+
+    def current_file(self) -> str:
+        return os.path.join(self.root, CURRENT_FILE)
+
+    def list_versions(self) -> List[str]:
+        if not self.exists():
+            return []
+        # Skips publish()'s hidden staging directories
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(self.current_file(), 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def artifact_paths(self, version: str) -> Dict[str, str]:
+        """Model, label encoder and feature column paths for a version"""
+        version_dir = os.path.join(self.root, version)
+        if not os.path.isdir(version_dir):
+            raise FileNotFoundError(f"Model version {version} not found in {self.root}")
+        model_path = next(
+            (os.path.join(version_dir, name) for name in MODEL_FILES
+             if os.path.exists(os.path.join(version_dir, name))),
+            None
+        )
+        if model_path is None:
+            raise FileNotFoundError(f"Model version {version} has no model file")
+        return {
+            "model_path": model_path,
+            "label_encoders_path": os.path.join(version_dir, "label_encoders.json"),
+            "feature_columns_path": os.path.join(version_dir, "feature_columns.json"),
+        }
+
+    def activate(self, version: str):
+        """Point CURRENT at an existing version"""
+        self.artifact_paths(version)
+        tmp_path = f"{self.current_file()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, self.current_file())
+
+    def publish(self, version: str, source_dir: str = ".", activate: bool = False) -> str:
+        """Copy the model artifacts in source_dir into a new version directory"""
+        version_dir = os.path.join(self.root, version)
+        if os.path.exists(version_dir):
+            raise FileExistsError(f"Model version {version} already exists")
+
+        files = [name for name in MODEL_FILES + ARTIFACT_FILES
+                 if os.path.exists(os.path.join(source_dir, name))]
+        if not any(name in files for name in MODEL_FILES):
+            raise FileNotFoundError(f"No model file in {source_dir}")
+
+        # Stage in a temporary directory and rename, so a version appears complete or not at all
+        staging_dir = os.path.join(self.root, f".{version}.staging")
+        os.makedirs(staging_dir, exist_ok=True)
+        for name in files:
+            shutil.copy2(os.path.join(source_dir, name), os.path.join(staging_dir, name))
+        os.replace(staging_dir, version_dir)
+
+        if activate:
+            self.activate(version)
+        return version_dir
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage versioned model artifacts")
+    parser.add_argument("--root", default=MODEL_REGISTRY_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List versions")
+    publish_parser = subparsers.add_parser("publish", help="Publish artifacts as a new version")
+    publish_parser.add_argument("version")
+    publish_parser.add_argument("--source", default=".", help="Directory holding the artifacts")
+    publish_parser.add_argument("--activate", action="store_true")
+    activate_parser = subparsers.add_parser("activate", help="Make a version current")
+    activate_parser.add_argument("version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "list":
+        current = registry.current_version()
+        for version in registry.list_versions():
+            print(f"{'*' if version == current else ' '} {version}")
+    elif args.command == "publish":
+        print(f"Published {registry.publish(args.version, args.source, args.activate)}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"Activated {args.version}")
+
+if __name__ == "__main__":
+    main()
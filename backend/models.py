@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import Annotated, Dict, List, Optional, Literal, Union
 
 class LoanApplication(BaseModel):
     LoanID: str = Field(..., description="Unique loan identifier")
@@ -15,12 +15,79 @@ class LoanApplication(BaseModel):
     Education: Literal["High School", "Bachelor's", "Master's", "PhD"]
     EmploymentType: Literal["Unemployed", "Part-time", "Full-time", "Self-employed"]
     MaritalStatus: Literal["Single", "Married", "Divorced"]
-    HasMortgage: bool = Field(..., description="Whether applicant has mortgage")
-    HasDependents: bool = Field(..., description="Whether applicant has dependents")
+    # Unchecked checkboxes are omitted by the web form, so flags default to False
+    HasMortgage: bool = Field(False, description="Whether applicant has mortgage")
+    HasDependents: bool = Field(False, description="Whether applicant has dependents")
     LoanPurpose: Literal["Business", "Education", "Home", "Car", "Debt Consolidation", "Other"]
-    HasCoSigner: bool = Field(..., description="Whether applicant has co-signer")
+    HasCoSigner: bool = Field(False, description="Whether applicant has co-signer")
 
 class PredictionResponse(BaseModel):
     prediction: int = Field(..., description="0 for rejected, 1 for approved")
     probability: float = Field(..., ge=0, le=1, description="Prediction probability")
-    loan_id: str = Field(..., description="Loan identifier")
\ No newline at end of file
+    loan_id: str = Field(..., description="Loan identifier")
+    model_version: Optional[str] = Field(None, description="Model version that produced the prediction")
+    saved_to_database: bool = Field(False, description="Whether the prediction was queued for storage")
+
+class BatchPredictionItem(BaseModel):
+    loan_id: str
+    prediction: int = Field(..., description="0 for rejected, 1 for approved")
+    probability: float = Field(..., ge=0, le=1)
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[BatchPredictionItem]
+    total: int
+    model_version: Optional[str] = None
+    saved_to_database: bool = False
+
+class FeatureContribution(BaseModel):
+    feature: str
+    value: Optional[Union[bool, int, float, str]] = Field(None, description="Submitted value of the feature")
+    contribution: float = Field(..., description="Effect on the approval log-odds")
+
+class ExplanationResponse(BaseModel):
+    loan_id: str
+    prediction: int = Field(..., description="0 for rejected, 1 for approved")
+    probability: float = Field(..., ge=0, le=1)
+    base_value: float = Field(..., description="Log-odds before any feature is taken into account")
+    contributions: List[FeatureContribution]
+    model_version: Optional[str] = None
+
+class BatchExplanationResponse(BaseModel):
+    explanations: List[ExplanationResponse]
+    total: int
+    model_version: Optional[str] = None
+
+class WhatIfGrid(BaseModel):
+    """Values to try for each varied field; omitted fields keep the base value"""
+    model_config = ConfigDict(extra="forbid")
+
+    LoanAmount: Optional[List[Annotated[float, Field(ge=0)]]] = Field(None, min_length=1)
+    LoanTerm: Optional[List[Annotated[int, Field(ge=1)]]] = Field(None, min_length=1)
+    InterestRate: Optional[List[Annotated[float, Field(ge=0, le=50)]]] = Field(None, min_length=1)
+    HasCoSigner: Optional[List[bool]] = Field(None, min_length=1)
+
+    def values(self) -> Dict[str, List]:
+        return {name: values for name, values in self.__dict__.items() if values is not None}
+
+class WhatIfRequest(BaseModel):
+    application: LoanApplication
+    grid: WhatIfGrid
+
+class WhatIfOutcome(BaseModel):
+    prediction: int = Field(..., description="0 for rejected, 1 for approved")
+    probability: float = Field(..., ge=0, le=1)
+
+class WhatIfResponse(BaseModel):
+    loan_id: str
+    baseline: WhatIfOutcome
+    parameters: List[str] = Field(..., description="Varied fields, slowest-varying first")
+    shape: List[int] = Field(..., description="Number of values tried per parameter")
+    variants: List[Dict[str, Union[bool, int, float]]] = Field(
+        ..., description="Parameter values plus prediction and probability for every combination"
+    )
+    total: int
+    model_version: Optional[str] = None
+
+# Compiled validators for raw request bodies: pydantic-core parses and
+# validates the JSON bytes in one pass, without building an intermediate dict
+LOAN_APPLICATION_BATCH = TypeAdapter(List[LoanApplication])
\ No newline at end of file
@@ -1,32 +1,123 @@
-import pandas as pd
 import numpy as np
 import json
-import xgboost as xgb
-from typing import Dict, List
+from typing import Dict, List, Optional
+import itertools
 import os
+import threading
+import time
+from feature_encoder import FeatureEncoder, CATEGORICAL_COLUMNS
+from prediction_cache import PredictionCache
+from model_registry import ModelRegistry, file_version
+from metrics import observe_stage
+from cpu_budget import xgb_nthread
+from tree_engine import TreeEnsemble
+
+# Model artifacts in order of preference: UBJSON loads several times faster
+MODEL_PATHS = ['xgboost_model.ubj', 'xgboost_model.json']
+
+# Scoring backend: 'xgboost', or 'numpy' for the compiled tree evaluator in
+# tree_engine.py, which skips xgboost's per-call overhead and import time
+PREDICTION_ENGINES = ('xgboost', 'numpy')
+
+# Known-good application used to warm the model before serving traffic
+SAMPLE_APPLICATION = {
+    'LoanID': 'WARMUP',
+    'Age': 35,
+    'Income': 60000.0,
+    'LoanAmount': 20000.0,
+    'CreditScore': 700,
+    'MonthsEmployed': 48,
+    'NumCreditLines': 3,
+    'InterestRate': 7.5,
+    'LoanTerm': 36,
+    'DTIRatio': 0.3,
+    'Education': "Bachelor's",
+    'EmploymentType': 'Full-time',
+    'MaritalStatus': 'Married',
+    'HasMortgage': True,
+    'HasDependents': False,
+    'LoanPurpose': 'Home',
+    'HasCoSigner': False,
+}
+
+def resolve_model_path() -> Optional[str]:
+    """MODEL_PATH if set, else the preferred model artifact that exists"""
+    if os.environ.get('MODEL_PATH'):
+        return os.environ['MODEL_PATH']
+    existing = [path for path in MODEL_PATHS if os.path.exists(path)]
+    if not existing:
+        return None
+    binary_path, json_path = MODEL_PATHS
+    # A JSON model newer than the binary one was replaced by hand; don't serve the stale copy
+    if binary_path in existing and json_path in existing:
+        if os.path.getmtime(json_path) > os.path.getmtime(binary_path) + 1:
+            return json_path
+    return existing[0]
 
 class LoanPredictor:
-    def __init__(self, model_path: str = 'xgboost_model.json'):
-        self.model = None
+    def __init__(self, model_path: Optional[str] = None,
+                 label_encoders_path: str = 'label_encoders.json',
+                 feature_columns_path: str = 'feature_columns.json',
+                 version: Optional[str] = None,
+                 engine: Optional[str] = None):
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.tree_engine = None
         self.label_encoders = None
         self.feature_columns = None
-        self.model_path = model_path
+        self.encoder = None
+        self.cache = None
+        self.explanation_cache = None
+        self.model_path = model_path or resolve_model_path() or MODEL_PATHS[-1]
+        self.label_encoders_path = label_encoders_path
+        self.feature_columns_path = feature_columns_path
+        self.version = version
+        self.engine = engine or os.environ.get('PREDICTION_ENGINE', 'xgboost')
+        if self.engine not in PREDICTION_ENGINES:
+            raise ValueError(f"Unknown prediction engine {self.engine}, expected one of {PREDICTION_ENGINES}")
         self.load_model()
     
+    @property
+    def model(self):
+        """The XGBoost model; with the numpy engine it is only loaded when first needed (explanations)"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_xgboost()
+        return self._model
+    
+    def _load_xgboost(self):
+        import xgboost as xgb
+        model = xgb.XGBClassifier()
+        model.load_model(self.model_path)
+        model.set_params(n_jobs=xgb_nthread())
+        print("XGBoost model loaded successfully!")
+        return model
+    
+    def enable_cache(self, max_size: int = 10000, ttl: float = 300.0):
+        """Memoize single-application results and explanations, invalidated when the model file changes"""
+        self.cache = PredictionCache(max_size=max_size, ttl=ttl, model_path=self.model_path)
+        self.explanation_cache = PredictionCache(max_size=max_size, ttl=ttl, model_path=self.model_path)
+    
     def load_model(self):
         """Load the trained model and preprocessing artifacts"""
         try:
             # Load model
-            if os.path.exists(self.model_path):
-                self.model = xgb.XGBClassifier()
-                self.model.load_model(self.model_path)
-                print("XGBoost model loaded successfully!")
-            else:
+            if not os.path.exists(self.model_path):
                 raise FileNotFoundError(f"Model file {self.model_path} not found")
+            if self.engine == 'numpy':
+                self.tree_engine = TreeEnsemble.load(self.model_path)
+                print(f"Tree engine compiled successfully ({self.tree_engine.n_trees} trees)!")
+            else:
+                self._model = self._load_xgboost()
+            
+            # Artifacts loaded outside the registry are versioned by content
+            if self.version is None:
+                self.version = file_version(self.model_path)
             
             # Load label encoders
-            if os.path.exists('label_encoders.json'):
-                with open('label_encoders.json', 'r') as f:
+            if os.path.exists(self.label_encoders_path):
+                with open(self.label_encoders_path, 'r') as f:
                     encoders_data = json.load(f)
                 self.label_encoders = {}
                 for col, data in encoders_data.items():
@@ -34,24 +125,28 @@ class LoanPredictor:
                 print("Label encoders loaded successfully!")
             
             # Load feature columns
-            if os.path.exists('feature_columns.json'):
-                with open('feature_columns.json', 'r') as f:
+            if os.path.exists(self.feature_columns_path):
+                with open(self.feature_columns_path, 'r') as f:
                     self.feature_columns = json.load(f)
                 print("Feature columns loaded successfully!")
+            
+            # Compile the request encoder once for the hot path
+            self.encoder = FeatureEncoder(self.feature_columns, self.label_encoders or {})
                 
         except Exception as e:
             print(f"Error loading model: {e}")
             raise
     
-    def preprocess_input(self, input_data: Dict) -> pd.DataFrame:
+    def preprocess_input(self, input_data: Dict):
         """Preprocess input data for prediction"""
+        # pandas is only needed on this legacy path; keep it out of startup
+        import pandas as pd
+        
         # Create DataFrame
         df = pd.DataFrame([input_data])
         
         # Encode categorical variables
-        categorical_columns = ['Education', 'EmploymentType', 'MaritalStatus', 'LoanPurpose']
-        
-        for col in categorical_columns:
+        for col in CATEGORICAL_COLUMNS:
             if col in self.label_encoders:
                 classes = self.label_encoders[col]
                 if input_data[col] in classes:
@@ -72,15 +167,150 @@ class LoanPredictor:
         
         return df
     
+    def encode_many(self, applications: List[Dict]) -> np.ndarray:
+        """Encode a batch of applications into one contiguous float32 matrix"""
+        return self.encoder.encode_many(applications)
+    
+    def predict_proba_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Approval probabilities for an already encoded feature matrix"""
+        if self.tree_engine is not None:
+            return self.tree_engine.predict_proba(X)
+        return self.model.predict_proba(X)[:, 1]
+    
+    def predict_many(self, applications: List[Dict]) -> tuple:
+        """Make predictions for a batch of applications with a single booster call"""
+        try:
+            started = time.perf_counter()
+            X = self.encode_many(applications)
+            encoded = time.perf_counter()
+            probabilities = self.predict_proba_matrix(X)
+            observe_stage('preprocess', encoded - started)
+            observe_stage('booster', time.perf_counter() - encoded)
+            # Same 0.5 cut-off XGBClassifier.predict applies for binary:logistic
+            predictions = (probabilities > 0.5).astype(np.int64)
+            
+            return predictions, probabilities
+            
+        except Exception as e:
+            print(f"Batch prediction error: {e}")
+            raise
+    
+    def what_if(self, application: Dict, grid: Dict[str, List]) -> Dict:
+        """Score every combination of grid values on top of one application.
+
+        The base application is scored in the same booster call as its variants.
+        """
+        try:
+            started = time.perf_counter()
+            X = np.vstack([self.encoder.encode(application), self.encoder.encode_grid(application, grid)])
+            encoded = time.perf_counter()
+            probabilities = self.predict_proba_matrix(X).tolist()
+            observe_stage('preprocess', encoded - started)
+            observe_stage('booster', time.perf_counter() - encoded)
+            
+            names = list(grid)
+            variants = []
+            for values, probability in zip(itertools.product(*grid.values()), probabilities[1:]):
+                variant = dict(zip(names, values))
+                variant['prediction'] = int(probability > 0.5)
+                variant['probability'] = probability
+                variants.append(variant)
+            
+            return {
+                'loan_id': application.get('LoanID'),
+                'baseline': {'prediction': int(probabilities[0] > 0.5), 'probability': probabilities[0]},
+                'parameters': names,
+                'shape': [len(values) for values in grid.values()],
+                'variants': variants,
+                'total': len(variants)
+            }
+            
+        except Exception as e:
+            print(f"What-if error: {e}")
+            raise
+    
+    def contributions_matrix(self, X: np.ndarray) -> np.ndarray:
+        """TreeSHAP contributions in log-odds, one column per feature plus the bias last"""
+        # Explanations always come from xgboost, whichever engine scores
+        import xgboost as xgb
+        booster = self.model.get_booster()
+        return booster.predict(xgb.DMatrix(X, feature_names=self.feature_columns), pred_contribs=True)
+    
+    def explanation(self, contributions: np.ndarray, application: Dict, top_k: Optional[int] = None) -> Dict:
+        """Readable explanation for one row of contributions_matrix, largest effects first"""
+        # Contributions plus the bias sum to the model's log-odds
+        probability = float(1.0 / (1.0 + np.exp(-float(contributions.sum()))))
+        order = np.argsort(-np.abs(contributions[:-1]), kind='stable')
+        if top_k is not None:
+            order = order[:top_k]
+        return {
+            'loan_id': application.get('LoanID'),
+            'prediction': int(probability > 0.5),
+            'probability': probability,
+            'base_value': float(contributions[-1]),
+            'contributions': [
+                {
+                    'feature': self.feature_columns[i],
+                    'value': application.get(self.feature_columns[i]),
+                    'contribution': float(contributions[i])
+                }
+                for i in order.tolist()
+            ]
+        }
+    
+    def explain_many(self, applications: List[Dict], top_k: Optional[int] = None) -> List[Dict]:
+        """Explain a batch with one TreeSHAP call covering the rows not already cached"""
+        try:
+            X = self.encode_many(applications)
+            rows = [None] * len(applications)
+            keys = None
+            if self.explanation_cache is not None:
+                keys = [PredictionCache.key(features) for features in X]
+                rows = [self.explanation_cache.get(key) for key in keys]
+            missing = [i for i, row in enumerate(rows) if row is None]
+            
+            if missing:
+                started = time.perf_counter()
+                contributions = self.contributions_matrix(X[missing])
+                observe_stage('explain', time.perf_counter() - started)
+                for i, row in zip(missing, contributions):
+                    # Copy so a cached row doesn't pin the whole batch matrix
+                    rows[i] = row.copy()
+                    if keys is not None:
+                        self.explanation_cache.put(keys[i], rows[i])
+            
+            return [self.explanation(row, application, top_k) for row, application in zip(rows, applications)]
+            
+        except Exception as e:
+            print(f"Explanation error: {e}")
+            raise
+    
+    def explain(self, input_data: Dict, top_k: Optional[int] = None) -> Dict:
+        """Per-feature contributions behind a single prediction"""
+        return self.explain_many([input_data], top_k)[0]
+    
     def predict(self, input_data: Dict) -> tuple:
         """Make prediction on input data"""
         try:
-            # Preprocess input
-            processed_data = self.preprocess_input(input_data)
+            # Encode straight into the preallocated feature buffer
+            started = time.perf_counter()
+            features = self.encoder.encode(input_data)
+            observe_stage('preprocess', time.perf_counter() - started)
+            
+            if self.cache is not None:
+                key = PredictionCache.key(features)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
             
-            # Make prediction
-            prediction = self.model.predict(processed_data)[0]
-            probability = self.model.predict_proba(processed_data)[0][1]
+            # Make prediction (label derived from the probability, one booster call)
+            started = time.perf_counter()
+            probability = self.predict_proba_matrix(features)[0]
+            observe_stage('booster', time.perf_counter() - started)
+            prediction = np.int64(probability > 0.5)
+            
+            if self.cache is not None:
+                self.cache.put(key, (prediction, probability))
             
             return prediction, probability
             
@@ -88,12 +318,108 @@ class LoanPredictor:
             print(f"Prediction error: {e}")
             raise
 
-# Global predictor instance
-predictor = None
+def build_predictor(**kwargs) -> LoanPredictor:
+    """Create a predictor with the environment's cache settings"""
+    predictor = LoanPredictor(**kwargs)
+    # Opt-in result cache: PREDICTION_CACHE_SIZE > 0 enables it
+    cache_size = int(os.environ.get('PREDICTION_CACHE_SIZE', 0))
+    if cache_size > 0:
+        predictor.enable_cache(
+            max_size=cache_size,
+            ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+        )
+    return predictor
+
+class ModelManager:
+    """Owns the serving predictor and hot-swaps it without pausing traffic.
+
+    A new version is loaded and warmed on the calling thread while the old
+    one keeps serving, then swapped in with a single reference assignment.
+    Requests read `manager.predictor` once and use that object throughout,
+    so each response is served by exactly one model version.
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or ModelRegistry()
+        self.predictor = None
+        self.loaded_at = None
+        self._reload_lock = threading.Lock()
+        self._watch_stop = threading.Event()
+        self._watch_thread = None
+
+    def load(self, version: Optional[str] = None, warm: bool = True) -> LoanPredictor:
+        """Build and warm a predictor for `version` (registry CURRENT, else legacy files)"""
+        if version is None and self.registry.exists():
+            version = self.registry.current_version()
+        if version is not None:
+            new_predictor = build_predictor(version=version, **self.registry.artifact_paths(version))
+        else:
+            new_predictor = build_predictor()
+        if warm:
+            new_predictor.predict(SAMPLE_APPLICATION)
+        return new_predictor
+
+    def reload(self, version: Optional[str] = None, warm: bool = True, activate: bool = False) -> str:
+        """Load a version in the background of serving, then swap it in.
+
+        With activate, registry CURRENT is repointed to the version once it is
+        serving; a version that fails to load or warm is never made current.
+        """
+        with self._reload_lock:
+            new_predictor = self.load(version, warm)
+            previous = self._swap(new_predictor)
+            if activate and version is not None:
+                self.registry.activate(version)
+        print(f"Model version {new_predictor.version} now serving (was {previous})")
+        return new_predictor.version
+
+    def _swap(self, new_predictor: LoanPredictor) -> Optional[str]:
+        # Caller holds _reload_lock
+        previous = self.predictor.version if self.predictor is not None else None
+        self.predictor = new_predictor
+        self.loaded_at = time.time()
+        return previous
+
+    def _reload_if_changed(self):
+        # CURRENT is re-read under the lock, so a reload that just activated a
+        # version is never undone by a stale read
+        with self._reload_lock:
+            version = self.registry.current_version()
+            if version is None or self.predictor is None or version == self.predictor.version:
+                return
+            new_predictor = self.load(version)
+            previous = self._swap(new_predictor)
+        print(f"Model version {new_predictor.version} now serving (was {previous})")
+
+    def start_watcher(self, interval: float):
+        """Poll the registry's CURRENT file and reload when it changes"""
+        if interval <= 0 or self._watch_thread is not None:
+            return
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch, args=(interval,), name="model-watcher", daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_watcher(self):
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    def _watch(self, interval: float):
+        while not self._watch_stop.wait(interval):
+            try:
+                self._reload_if_changed()
+            except Exception as e:
+                # Keep serving the old version; retry on the next tick
+                print(f"Model reload to {self.registry.current_version()} failed: {e}")
+
+# Global model manager
+model_manager = ModelManager()
 
 def get_predictor():
-    """Get or create the predictor instance"""
-    global predictor
-    if predictor is None:
-        predictor = LoanPredictor()
-    return predictor
\ No newline at end of file
+    """Get the serving predictor, loading it on first use"""
+    if model_manager.predictor is None:
+        model_manager.reload()
+    return model_manager.predictor
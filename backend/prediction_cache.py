@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+class PredictionCache:
+    """Size-bounded LRU cache with a TTL for prediction results.
+
+    Entries are keyed on a hash of the encoded feature vector, so resubmitted
+    applications hit regardless of LoanID or field order. When bound to a model
+    file the cache empties itself as soon as that file changes on disk.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0,
+                 model_path: Optional[str] = None, check_interval: float = 1.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.model_path = model_path
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_signature = self._file_signature()
+        self._next_check = time.monotonic() + check_interval
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def key(features: np.ndarray) -> bytes:
+        """Canonical key for an encoded float32 feature vector"""
+        return hashlib.blake2b(np.ascontiguousarray(features).tobytes(), digest_size=16).digest()
+
+    def get(self, key: bytes):
+        """Cached value for `key`, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            self._check_model_file(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key: bytes, value):
+        """Store `value`, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+
+    def metrics(self) -> Dict:
+        """Snapshot of cache counters"""
+        with self._lock:
+            snapshot = dict(self.stats)
+            snapshot["size"] = len(self._entries)
+        snapshot["max_size"] = self.max_size
+        snapshot["ttl_seconds"] = self.ttl
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = snapshot["hits"] / lookups if lookups else 0.0
+        return snapshot
+
+    def _file_signature(self):
+        if self.model_path is None:
+            return None
+        try:
+            stat = os.stat(self.model_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _check_model_file(self, now: float):
+        # Called with the lock held; stats the model file at most once per interval
+        if self.model_path is None or now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        signature = self._file_signature()
+        if signature != self._model_signature:
+            self._model_signature = signature
+            self._entries.clear()
+            self.stats["invalidations"] += 1
@@ -0,0 +1,82 @@
+import base64
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from database import Prediction
+
+# Columns that may be requested through `fields`; id and created_at are
+# always selected because they form the pagination key
+PROJECTABLE_COLUMNS = {
+    column.name: column for column in Prediction.__table__.columns
+}
+DEFAULT_FIELDS = ["id", "loan_id", "prediction_result", "confidence", "age", "income", "created_at"]
+
+def encode_cursor(created_at: datetime, prediction_id: int) -> str:
+    """Opaque cursor pointing just past the given row"""
+    raw = f"{created_at.isoformat()}|{prediction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        created_at, prediction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(prediction_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Validated list of column names to project"""
+    if not fields:
+        return list(DEFAULT_FIELDS)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in PROJECTABLE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # Pagination key columns come first and are always present
+    return ["id", "created_at"] + [name for name in requested if name not in ("id", "created_at")]
+
+def fetch_predictions_page(db: Session, limit: int = 50, cursor: Optional[str] = None,
+                           start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           outcome: Optional[bool] = None,
+                           min_confidence: Optional[float] = None,
+                           max_confidence: Optional[float] = None,
+                           fields: Optional[List[str]] = None) -> Dict:
+    """One page of predictions, newest first, using keyset pagination on (created_at, id).
+
+    Only the requested columns are selected, and each page is an index range
+    scan on ix_predictions_created_at_id no matter how far back it is.
+    """
+    fields = fields or list(DEFAULT_FIELDS)
+    columns = [PROJECTABLE_COLUMNS[name] for name in fields]
+    stmt = select(*columns)
+
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(Prediction.created_at, Prediction.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    if start is not None:
+        stmt = stmt.where(Prediction.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Prediction.created_at < end)
+    if outcome is not None:
+        stmt = stmt.where(Prediction.prediction_result == outcome)
+    if min_confidence is not None:
+        stmt = stmt.where(Prediction.confidence >= min_confidence)
+    if max_confidence is not None:
+        stmt = stmt.where(Prediction.confidence <= max_confidence)
+
+    # Fetch one extra row to know whether another page exists
+    stmt = stmt.order_by(Prediction.created_at.desc(), Prediction.id.desc()).limit(limit + 1)
+    rows = db.execute(stmt).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return {"rows": [row._mapping for row in rows], "next_cursor": next_cursor}
@@ -0,0 +1,234 @@
+"""Incrementally maintained approval-rate rollups of the predictions table.
+
+PredictionWriter calls apply_rollup_deltas in the same transaction as each
+bulk upsert, so prediction_rollups always matches what was persisted. A
+loan_id that is written again moves its contribution from its previous
+(day, loan_purpose, employment_type) group to the new one.
+
+On Postgres, writers hold a shared advisory lock and a rebuild an exclusive
+one, so a rebuild never interleaves with delta writes, and each writer also
+locks its batch's loan_ids so two flushes of the same loan_id apply their
+deltas one after the other.
+
+Usage (from backend/), to rebuild from history after a schema change:
+    python prediction_rollups.py --rebuild
+"""
+import argparse
+import hashlib
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, bindparam, cast, delete, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, INTEGER
+from sqlalchemy.orm import Session
+
+from database import Prediction, PredictionRollup
+
+DIMENSIONS = ["day", "loan_purpose", "employment_type"]
+# Stands in for a missing category, since rollup key columns can't be NULL
+UNKNOWN = "unknown"
+
+# Advisory lock namespaces (first key of pg_advisory_xact_lock(int, int))
+ROLLUP_LOCK = 0x524f4c4c
+LOAN_ID_LOCK = 0x4c4f414e
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def _lock_rollups(db: Session, exclusive: bool):
+    # Held until the transaction ends; SQLite serializes writers anyway
+    if _is_postgres(db):
+        function = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+        db.execute(text(f"SELECT {function}(:namespace, 0)"), {"namespace": ROLLUP_LOCK})
+
+def _lock_loan_ids(db: Session, loan_ids: List[str]):
+    # The predictions row of a new loan_id doesn't exist yet, so SELECT ... FOR
+    # UPDATE can't serialize two writers inserting it; lock a hash of the id
+    # instead, in sorted order so concurrent batches can't deadlock
+    if not _is_postgres(db):
+        return
+    keys = sorted({int.from_bytes(hashlib.blake2b(str(loan_id).encode(), digest_size=4).digest(), "big", signed=True)
+                   for loan_id in loan_ids})
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(:namespace, key) FROM (SELECT unnest(:keys) AS key ORDER BY 1) AS keys")
+        .bindparams(bindparam("keys", type_=ARRAY(INTEGER))),
+        {"namespace": LOAN_ID_LOCK, "keys": keys}
+    )
+
+def _insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Rollup upsert not supported for dialect {dialect}")
+    return insert
+
+def _day(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+def _key(row) -> tuple:
+    return (_day(row["created_at"]), row["loan_purpose"] or UNKNOWN, row["employment_type"] or UNKNOWN)
+
+def rollup_deltas(rows: List[Dict], previous: List[Dict]) -> Dict[tuple, list]:
+    """[count, approved, confidence_sum] changes per group for rows replacing `previous`"""
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for row, sign in [(row, -1) for row in previous] + [(row, 1) for row in rows]:
+        delta = deltas[_key(row)]
+        delta[0] += sign
+        delta[1] += sign * int(bool(row["prediction_result"]))
+        delta[2] += sign * float(row["confidence"] or 0.0)
+    return {key: delta for key, delta in deltas.items() if delta[0] or delta[1] or delta[2]}
+
+def upsert_rollup_deltas(db: Session, deltas: Dict[tuple, list], replace: bool = False):
+    """Add deltas to their rollup rows (or, with replace, overwrite them), creating rows for new groups"""
+    if not deltas:
+        return
+    table = PredictionRollup.__table__
+    stmt = _insert(db)(table).values([
+        {
+            "day": day,
+            "loan_purpose": loan_purpose,
+            "employment_type": employment_type,
+            "prediction_count": count,
+            "approved_count": approved,
+            "confidence_sum": confidence_sum,
+        }
+        # Sorted, so concurrent writers lock shared group rows in the same order and can't deadlock
+        for (day, loan_purpose, employment_type), (count, approved, confidence_sum) in sorted(deltas.items())
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=DIMENSIONS,
+        set_={
+            column: stmt.excluded[column] if replace else table.c[column] + stmt.excluded[column]
+            for column in ("prediction_count", "approved_count", "confidence_sum")
+        }
+    ))
+
+def apply_rollup_deltas(db: Session, rows: List[Dict]):
+    """Fold prediction rows that are about to be upserted into the rollups.
+
+    Must run in the upsert's transaction, before it, while the rows being
+    replaced can still be read.
+    """
+    loan_ids = [row["loan_id"] for row in rows]
+    _lock_rollups(db, exclusive=False)
+    _lock_loan_ids(db, loan_ids)
+    columns = [Prediction.loan_id, Prediction.created_at, Prediction.loan_purpose,
+               Prediction.employment_type, Prediction.prediction_result, Prediction.confidence]
+    stmt = select(*columns).where(Prediction.loan_id.in_(loan_ids))
+    previous = [dict(row._mapping) for row in db.execute(stmt)]
+    upsert_rollup_deltas(db, rollup_deltas(rows, previous))
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute every rollup row from the predictions table (a full scan)"""
+    _lock_rollups(db, exclusive=True)
+    return _rebuild(db)
+
+def _rebuild(db: Session) -> int:
+    # Caller holds the exclusive rollup lock
+    day = func.date(Prediction.created_at)
+    stmt = select(
+        day.label("day"),
+        Prediction.loan_purpose,
+        Prediction.employment_type,
+        func.count().label("prediction_count"),
+        func.sum(cast(Prediction.prediction_result, Integer)).label("approved_count"),
+        func.coalesce(func.sum(Prediction.confidence), 0.0).label("confidence_sum"),
+    ).where(Prediction.created_at.isnot(None)).group_by(day, Prediction.loan_purpose, Prediction.employment_type)
+
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    for row in db.execute(stmt):
+        total = totals[(_day(row.day), row.loan_purpose or UNKNOWN, row.employment_type or UNKNOWN)]
+        total[0] += row.prediction_count
+        total[1] += row.approved_count or 0
+        total[2] += row.confidence_sum
+    db.execute(delete(PredictionRollup))
+    # Absolute values, so the result never depends on what was there before
+    upsert_rollup_deltas(db, totals, replace=True)
+    db.commit()
+    return len(totals)
+
+def ensure_rollups(db: Session) -> bool:
+    """Backfill the rollups from history when the table is new; True if it rebuilt.
+
+    Every gunicorn worker calls this at startup; the exclusive lock makes the
+    others wait and then find the table already filled.
+    """
+    _lock_rollups(db, exclusive=True)
+    if (db.execute(select(PredictionRollup.day).limit(1)).first() is not None
+            or db.execute(select(Prediction.id).limit(1)).first() is None):
+        db.commit()
+        return False
+    _rebuild(db)
+    return True
+
+def fetch_stats(db: Session, group_by: List[str], start: Optional[date] = None,
+                end: Optional[date] = None) -> Dict:
+    """Approval rate and mean confidence per group, read from the rollups only"""
+    keys = [PredictionRollup.__table__.c[name] for name in group_by]
+    stmt = select(
+        *keys,
+        func.sum(PredictionRollup.prediction_count).label("count"),
+        func.sum(PredictionRollup.approved_count).label("approved"),
+        func.sum(PredictionRollup.confidence_sum).label("confidence_sum"),
+    )
+    if start is not None:
+        stmt = stmt.where(PredictionRollup.day >= start)
+    if end is not None:
+        stmt = stmt.where(PredictionRollup.day < end)
+    if keys:
+        stmt = stmt.group_by(*keys).order_by(*keys)
+
+    groups = []
+    totals = {"count": 0, "approved": 0, "confidence_sum": 0.0}
+    for row in db.execute(stmt):
+        count = int(row.count or 0)
+        if count <= 0:
+            continue
+        group = {name: getattr(row, name) for name in group_by}
+        if "day" in group:
+            group["day"] = _day(group["day"]).isoformat()
+        group.update(_summary(count, int(row.approved or 0), float(row.confidence_sum or 0.0)))
+        groups.append(group)
+        totals["count"] += count
+        totals["approved"] += int(row.approved or 0)
+        totals["confidence_sum"] += float(row.confidence_sum or 0.0)
+    return {
+        "group_by": group_by,
+        "groups": groups if keys else [],
+        "overall": _summary(totals["count"], totals["approved"], totals["confidence_sum"]),
+    }
+
+def _summary(count: int, approved: int, confidence_sum: float) -> Dict:
+    return {
+        "count": count,
+        "approved": approved,
+        "approval_rate": approved / count if count else None,
+        "mean_confidence": confidence_sum / count if count else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the prediction_rollups table")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all rollups from predictions")
+    args = parser.parse_args()
+
+    from database import SessionLocal, create_tables
+    create_tables()
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            print(f"Rebuilt {rebuild_rollups(db)} rollup rows")
+        else:
+            print("Backfilled rollups from history" if ensure_rollups(db) else "Rollups already present")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,16 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import accuracy_score, classification_report
 import xgboost as xgb
+import argparse
 import json
 import os
+import resource
+import shutil
+import tempfile
+import time
+from cpu_budget import available_cpus
+from feature_encoder import FeatureEncoder
+from drift_monitor import build_reference_profile, save_reference_profile, REFERENCE_PROFILE_FILE
 
 def generate_synthetic_data(n_samples=10000):
     """Generate synthetic loan application data"""
@@ -61,9 +69,9 @@ def generate_synthetic_data(n_samples=10000):
     print(f"Final approval rate: {df['Approved'].mean():.2f}")
     return df
 
-def preprocess_data(df):
-    """Preprocess the data for training"""
-    df_processed = df.copy()
+def preprocess_data(df, copy=True):
+    """Preprocess the data for training (in place when copy=False)"""
+    df_processed = df.copy() if copy else df
     
     # Encode categorical variables
     categorical_columns = ['Education', 'EmploymentType', 'MaritalStatus', 'LoanPurpose']
@@ -82,7 +90,7 @@ def train_xgboost_model():
     df = generate_synthetic_data(10000)
     
     print("Preprocessing data...")
-    df_processed, label_encoders = preprocess_data(df)
+    df_processed, label_encoders = preprocess_data(df, copy=False)
     
     # Prepare features and target
     feature_columns = [col for col in df_processed.columns if col != 'Approved']
@@ -121,8 +129,9 @@ def train_xgboost_model():
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred))
     
-    # Save model
+    # Save model (JSON for inspection, UBJSON for fast loading at startup)
     model.save_model('xgboost_model.json')
+    model.save_model('xgboost_model.ubj')
     
     # Save label encoders
     encoders_data = {}
@@ -138,9 +147,231 @@ def train_xgboost_model():
     with open('feature_columns.json', 'w') as f:
         json.dump(feature_columns, f, indent=2)
     
+    # Save the training distribution the live drift monitor compares against
+    profile = build_reference_profile(
+        X_train, y_pred_proba,
+        {col: data['classes'] for col, data in encoders_data.items()}
+    )
+    save_reference_profile(profile, REFERENCE_PROFILE_FILE)
+    
     print("Model and preprocessing artifacts saved successfully!")
     
     return model, label_encoders, feature_columns
 
+def file_chunks(path, chunk_size):
+    """Labelled DataFrame chunks from a CSV or Parquet file with an Approved column"""
+    from batch_score import read_chunks
+    yield from read_chunks(path, chunk_size)
+
+class ChunkIterator(xgb.DataIter):
+    """Feeds encoded chunks to xgboost without materializing the whole dataset.
+
+    Rows are split deterministically by position: every `validation_every`-th
+    row goes to the validation side, the rest to training.
+    """
+
+    def __init__(self, make_chunks, encoder, validation=False, validation_every=10):
+        self.make_chunks = make_chunks
+        self.encoder = encoder
+        self.validation = validation
+        self.validation_every = validation_every
+        self.rows = 0
+        self._chunks = None
+        self._offset = 0
+        super().__init__(release_data=True)
+
+    def reset(self):
+        self._chunks = None
+        self._offset = 0
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter(self.make_chunks())
+            self.rows = 0
+        for chunk in self._chunks:
+            positions = np.arange(self._offset, self._offset + len(chunk))
+            self._offset += len(chunk)
+            mask = (positions % self.validation_every == 0) == self.validation
+            if not mask.any():
+                continue
+            chunk = chunk[mask]
+            self.rows += len(chunk)
+            input_data(
+                data=self.encoder.encode_frame(chunk),
+                label=chunk['Approved'].astype(np.float32).to_numpy(),
+                feature_names=self.encoder.feature_columns
+            )
+            return True
+        return False
+
+def collect_rows(iterator, max_rows):
+    """Up to max_rows encoded rows from a ChunkIterator's side of the split, as a DataFrame"""
+    parts = []
+    iterator.reset()
+    while sum(len(part) for part in parts) < max_rows and iterator.next(lambda data, **_: parts.append(data)):
+        pass
+    iterator.reset()
+    X = np.vstack(parts)[:max_rows] if parts else np.empty((0, len(iterator.encoder.feature_columns)), np.float32)
+    return pd.DataFrame(X, columns=iterator.encoder.feature_columns)
+
+def peak_memory_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def train_pipeline(source, output_dir=None, chunk_size=100000, num_boost_round=100,
+                   early_stopping_rounds=10, warm_start=True, nthread=None, max_bin=256,
+                   profile_rows=100000):
+    """Stream training data through QuantileDMatrix and (continue to) boost a model.
+
+    `source` is a CSV/Parquet path with the feature_columns.json columns plus
+    an observed Approved outcome. Categorical encodings come from the serving
+    model's label_encoders.json so a warm-started model keeps the encoding it
+    was trained with. Artifacts are written to `output_dir` (a fresh temporary
+    directory by default), never over the serving files; put them live with
+    ModelRegistry.publish.
+    """
+    if source == 'database':
+        raise ValueError(
+            "The predictions table has no ground-truth outcome: prediction_result is the model's "
+            "own output, and training on it only teaches the model to reproduce itself. "
+            "Train from a CSV/Parquet file of observed outcomes instead."
+        )
+    started = time.perf_counter()
+
+    # Start from the artifacts being served: registry CURRENT, else the legacy files
+    from model_registry import ModelRegistry
+    from prediction import resolve_model_path
+    registry = ModelRegistry()
+    current = registry.current_version()
+    if current is not None:
+        artifacts = registry.artifact_paths(current)
+    else:
+        artifacts = {
+            "model_path": resolve_model_path(),
+            "label_encoders_path": 'label_encoders.json',
+            "feature_columns_path": 'feature_columns.json',
+        }
+
+    with open(artifacts["feature_columns_path"], 'r') as f:
+        feature_columns = json.load(f)
+    with open(artifacts["label_encoders_path"], 'r') as f:
+        label_encoders = {col: data['classes'] for col, data in json.load(f).items()}
+    encoder = FeatureEncoder(feature_columns, label_encoders)
+
+    make_chunks = lambda: file_chunks(source, chunk_size)
+
+    nthread = nthread or available_cpus()
+    train_iter = ChunkIterator(make_chunks, encoder)
+    valid_iter = ChunkIterator(make_chunks, encoder, validation=True)
+
+    print(f"Building quantile matrices from {source}...")
+    dtrain = xgb.QuantileDMatrix(train_iter, max_bin=max_bin, nthread=nthread)
+    dvalid = xgb.QuantileDMatrix(valid_iter, ref=dtrain, nthread=nthread)
+    print(f"Training rows: {dtrain.num_row()}, validation rows: {dvalid.num_row()}")
+
+    base_model = artifacts["model_path"] if warm_start else None
+    if base_model is not None:
+        print(f"Warm-starting from {base_model}")
+
+    params = {
+        'objective': 'binary:logistic',
+        'tree_method': 'hist',
+        'max_depth': 6,
+        'learning_rate': 0.1,
+        'subsample': 0.8,
+        'colsample_bytree': 0.8,
+        'max_bin': max_bin,
+        'eval_metric': 'logloss',
+        'nthread': nthread,
+        'seed': 42,
+    }
+
+    fit_started = time.perf_counter()
+    booster = xgb.train(
+        params,
+        dtrain,
+        num_boost_round=num_boost_round,
+        evals=[(dvalid, 'validation')],
+        early_stopping_rounds=early_stopping_rounds,
+        xgb_model=base_model,
+        verbose_eval=10
+    )
+    fit_seconds = time.perf_counter() - fit_started
+
+    # Drop rounds past the best validation score before saving
+    if early_stopping_rounds and hasattr(booster, 'best_iteration'):
+        booster = booster[:booster.best_iteration + 1]
+
+    output_dir = output_dir or tempfile.mkdtemp(prefix='creditpath-train-')
+    os.makedirs(output_dir, exist_ok=True)
+    booster.save_model(os.path.join(output_dir, 'xgboost_model.json'))
+    booster.save_model(os.path.join(output_dir, 'xgboost_model.ubj'))
+    # The encodings the model was trained with travel with it
+    shutil.copy2(artifacts["label_encoders_path"], os.path.join(output_dir, 'label_encoders.json'))
+    shutil.copy2(artifacts["feature_columns_path"], os.path.join(output_dir, 'feature_columns.json'))
+
+    # Drift reference for this model: held-out rows (capped) and its scores on them
+    X_profile = collect_rows(valid_iter, profile_rows)
+    if len(X_profile):
+        profile = build_reference_profile(
+            X_profile, booster.predict(xgb.DMatrix(X_profile.to_numpy(), feature_names=feature_columns)),
+            label_encoders
+        )
+        save_reference_profile(profile, os.path.join(output_dir, REFERENCE_PROFILE_FILE))
+
+    report = {
+        'source': source,
+        'output_dir': output_dir,
+        'train_rows': dtrain.num_row(),
+        'validation_rows': dvalid.num_row(),
+        'total_trees': booster.num_boosted_rounds(),
+        'warm_started_from': base_model,
+        'fit_seconds': fit_seconds,
+        'wall_clock_seconds': time.perf_counter() - started,
+        'peak_memory_mb': peak_memory_mb(),
+    }
+    print(f"Training finished in {report['wall_clock_seconds']:.1f}s "
+          f"(fit {fit_seconds:.1f}s), {report['total_trees']} trees, "
+          f"peak memory {report['peak_memory_mb']:.0f} MB")
+    print(f"Artifacts written to {output_dir}")
+    return booster, report
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the loan approval model")
+    parser.add_argument("--source", default=None,
+                        help="CSV/Parquet path with observed outcomes; omit to train from scratch on synthetic data")
+    parser.add_argument("--output-dir", default=None,
+                        help="Where --source training writes its artifacts (default: a new temporary directory)")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=100, help="Boosting rounds to add")
+    parser.add_argument("--early-stopping", type=int, default=10)
+    parser.add_argument("--no-warm-start", action="store_true", help="Train from scratch")
+    parser.add_argument("--nthread", type=int, default=None)
+    parser.add_argument("--max-bin", type=int, default=256)
+    parser.add_argument("--publish", default=None, metavar="VERSION",
+                        help="Publish the result to the model registry under VERSION")
+    parser.add_argument("--activate", action="store_true", help="Make the published version current")
+    args = parser.parse_args()
+
+    if args.source is None:
+        train_xgboost_model()
+        output_dir = '.'
+    else:
+        _, report = train_pipeline(
+            source=args.source,
+            output_dir=args.output_dir,
+            chunk_size=args.chunk_size,
+            num_boost_round=args.rounds,
+            early_stopping_rounds=args.early_stopping,
+            warm_start=not args.no_warm_start,
+            nthread=args.nthread,
+            max_bin=args.max_bin
+        )
+        output_dir = report['output_dir']
+
+    if args.publish:
+        from model_registry import ModelRegistry
+        print(f"Published {ModelRegistry().publish(args.publish, output_dir, args.activate)}")
+
 if __name__ == "__main__":
-    train_xgboost_model()
\ No newline at end of file
+    main()
\ No newline at end of file
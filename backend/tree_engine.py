@@ -0,0 +1,185 @@
+"""NumPy evaluator for the XGBoost model, without xgboost at serving time.
+
+Usage (from backend/):
+    python tree_engine.py --model xgboost_model.json
+checks the engine against xgboost on the training script's held-out test set.
+"""
+import argparse
+import json
+import os
+from typing import Dict
+
+import numpy as np
+
+class TreeEnsemble:
+    """An XGBoost binary:logistic gbtree model compiled into flat node arrays.
+
+    Every tree's nodes are concatenated into one set of arrays indexed by
+    global node id. Leaves point at themselves, so a fixed number of
+    traversal steps (the deepest tree's depth) walks every row down every
+    tree at once with vectorized gathers.
+    """
+
+    def __init__(self, left: np.ndarray, right: np.ndarray, feature: np.ndarray, threshold: np.ndarray,
+                 default_left: np.ndarray, value: np.ndarray, roots: np.ndarray, depth: int, base_margin: float):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.base_margin = base_margin
+
+    @classmethod
+    def from_model_dict(cls, model: Dict) -> "TreeEnsemble":
+        """Compile the parsed contents of an XGBoost JSON model file"""
+        learner = model['learner']
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Unsupported objective {objective}")
+        booster = learner['gradient_booster']
+        if booster.get('name', 'gbtree') != 'gbtree':
+            raise ValueError(f"Unsupported booster {booster.get('name')}")
+        trees = booster['model']['trees']
+
+        # Boosters saved by XGBClassifier after early stopping predict with the best iteration only
+        best_iteration = learner.get('attributes', {}).get('best_iteration')
+        if best_iteration is not None:
+            indptr = booster['model']['iteration_indptr']
+            trees = trees[:indptr[int(best_iteration) + 1]]
+
+        lefts, rights, features, thresholds, defaults, roots = [], [], [], [], [], []
+        depth = 0
+        offset = 0
+        for tree in trees:
+            if any(split_type != 0 for split_type in tree['split_type']):
+                raise ValueError("Categorical splits are not supported")
+            left = np.asarray(tree['left_children'], dtype=np.int64)
+            right = np.asarray(tree['right_children'], dtype=np.int64)
+            node_ids = np.arange(len(left), dtype=np.int64)
+            is_leaf = left == -1
+            lefts.append(np.where(is_leaf, node_ids, left) + offset)
+            rights.append(np.where(is_leaf, node_ids, right) + offset)
+            features.append(np.where(is_leaf, 0, tree['split_indices']))
+            # At leaves split_conditions holds the leaf value
+            thresholds.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+            defaults.append(np.asarray(tree['default_left'], dtype=bool))
+            roots.append(offset)
+            depth = max(depth, _tree_depth(left, right))
+            offset += len(left)
+
+        left = np.concatenate(lefts)
+        threshold = np.concatenate(thresholds)
+        # Leaf values are kept separately; at leaves the threshold is never used for a decision
+        value = np.where(left == np.arange(len(left)), threshold, 0.0).astype(np.float32)
+
+        # base_score is stored in probability space as a string like '[6.85375E-1]'
+        base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+        base_margin = float(np.log(base_score / (1.0 - base_score)))
+
+        return cls(left, np.concatenate(rights), np.concatenate(features).astype(np.int64), threshold,
+                   np.concatenate(defaults), value, np.asarray(roots, dtype=np.int64), depth, base_margin)
+
+    @classmethod
+    def load(cls, path: str) -> "TreeEnsemble":
+        """Compile a model file; binary models are read from the JSON copy saved alongside them"""
+        if not path.endswith('.json'):
+            json_path = os.path.splitext(path)[0] + '.json'
+            # Both copies are saved together (and publish preserves mtimes); a
+            # binary model newer than its JSON copy was replaced on its own, and
+            # the JSON would be a different, stale model
+            if os.path.exists(json_path) and os.path.getmtime(json_path) + 1 >= os.path.getmtime(path):
+                path = json_path
+            else:
+                # No usable JSON copy: let xgboost convert the binary model
+                import xgboost as xgb
+                raw = xgb.Booster(model_file=path).save_raw('json')
+                return cls.from_model_dict(json.loads(bytes(raw)))
+        with open(path, 'r') as f:
+            return cls.from_model_dict(json.load(f))
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node id reached in every tree, shape (rows, trees)"""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            # xgboost goes left when x < threshold; missing values follow default_left
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        """Log-odds for every row"""
+        return self.value[self.leaves(X)].sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Approval probability for every row, as float32 like xgboost"""
+        return (1.0 / (1.0 + np.exp(-self.predict_margin(X)))).astype(np.float32)
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth = 0
+    level = [0]
+    while level:
+        children = [child for node in level for child in (left[node], right[node]) if child != -1]
+        if not children:
+            break
+        depth += 1
+        level = children
+    return depth
+
+def check_parity(model_path: str, X: np.ndarray) -> Dict:
+    """Largest probability difference between the engine and xgboost on X"""
+    import xgboost as xgb
+
+    model = xgb.XGBClassifier()
+    model.load_model(model_path)
+    expected = model.predict_proba(X)[:, 1]
+    actual = TreeEnsemble.load(model_path).predict_proba(X)
+    difference = np.abs(expected.astype(np.float64) - actual)
+    return {
+        "rows": int(len(X)),
+        "max_abs_diff": float(difference.max()),
+        "mean_abs_diff": float(difference.mean()),
+        "decision_mismatches": int(((expected > 0.5) != (actual > 0.5)).sum()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the NumPy tree engine against xgboost")
+    parser.add_argument("--model", default="xgboost_model.json")
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+    from train_model import generate_synthetic_data, preprocess_data
+
+    # Same held-out split train_xgboost_model evaluates on
+    df, _ = preprocess_data(generate_synthetic_data(10000), copy=False)
+    with open('feature_columns.json', 'r') as f:
+        feature_columns = json.load(f)
+    _, X_test, _, _ = train_test_split(
+        df[feature_columns], df['Approved'], test_size=0.2, random_state=42, stratify=df['Approved']
+    )
+    X_test = X_test.to_numpy(dtype=np.float32)
+    # Exercise the missing-value branches as well
+    X_missing = X_test.copy()
+    X_missing[::7, ::3] = np.nan
+
+    ok = True
+    for name, X in (("test set", X_test), ("test set with missing values", X_missing)):
+        result = check_parity(args.model, X)
+        passed = result["max_abs_diff"] <= args.tolerance and result["decision_mismatches"] == 0
+        ok = ok and passed
+        print(f"{name}: {result['rows']} rows, max abs diff {result['max_abs_diff']:.2e}, "
+              f"{result['decision_mismatches']} decision mismatches -> {'OK' if passed else 'FAIL'}")
+    raise SystemExit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()